@@ -1,27 +1,115 @@
 from fastapi import Request, HTTPException, status
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from argon2.exceptions import InvalidHashError, VerificationError
+from itsdangerous import BadSignature, TimestampSigner
+from cachetools import TTLCache
+import base64
+import hashlib
+import os
 import secrets
-from config import USERS
+import threading
+import time
+from config import USERS, SESSION_TTL, SESSION_SECRET_KEY, PASSWORD_HASHER
+from services.redis_client import redis_client
 
-# Session management (in production, use proper session management)
-active_sessions = {}
+# Per-login nonce so each session cookie (and the report stored under it) is unique
+_TOKEN_BYTES = 24
 
-def get_current_user(request: Request) -> Optional[str]:
+# Session cookies carry the username, the user's session generation and the issue time,
+# signed so no server-side session store is needed
+_session_signer = TimestampSigner(SESSION_SECRET_KEY)
+
+# Recently validated cookies, so back-to-back requests skip the signature check.
+# Entries keep the cookie's own expiry, so caching never extends a session
+_validated_sessions = TTLCache(maxsize=10_000, ttl=30)
+
+# Per-user session generation, bumped on logout so every cookie issued before it is revoked.
+# Kept in Redis when configured so all workers see it; otherwise in process (single worker only)
+_local_generations: Dict[str, int] = {}
+
+# Verified against when the username is unknown, see authenticate_user
+_DUMMY_PASSWORD_HASH = PASSWORD_HASHER.hash(secrets.token_urlsafe(16))
+
+# Recently rejected credential pairs, so replaying the same bad login skips the argon2 verify.
+# Entries are keyed digests (never the password), and the user table is fixed at import,
+# so a rejected pair cannot become valid while cached
+_rejected_logins = TTLCache(maxsize=10_000, ttl=300)
+# Logins are verified in worker threads, so the cache is guarded
+_rejected_logins_lock = threading.Lock()
+_REJECTED_LOGIN_KEY = os.urandom(32)
+
+def _credential_digest(username: str, password: str) -> bytes:
+    """Keyed digest identifying a username/password pair"""
+    return hashlib.blake2b(f"{username}\0{password}".encode(), key=_REJECTED_LOGIN_KEY, digest_size=16).digest()
+
+def _generation_key(username: str) -> str:
+    """Redis key holding a user's session generation"""
+    return f"session_gen:{username}"
+
+async def _session_generation(username: str) -> int:
+    """The user's current session generation (0 until they first log out)"""
+    if redis_client is not None:
+        generation = await redis_client.get(_generation_key(username))
+        return int(generation) if generation is not None else 0
+    return _local_generations.get(username, 0)
+
+def _verify_session(session_id: str) -> Optional[Tuple[str, int, float]]:
+    """Username, generation and expiry time of a validly signed session cookie, or None"""
+    cached = _validated_sessions.get(session_id)
+    if cached is not None:
+        if time.time() < cached[2]:
+            return cached
+        _validated_sessions.pop(session_id, None)
+        return None
+    try:
+        value, signed_at = _session_signer.unsign(session_id, max_age=SESSION_TTL, return_timestamp=True)
+        username, generation, _nonce = value.decode().rsplit(":", 2)
+        session = (username, int(generation), signed_at.timestamp() + SESSION_TTL)
+    except (BadSignature, ValueError):
+        return None
+    if username not in USERS:
+        return None
+    _validated_sessions[session_id] = session
+    return session
+
+async def get_current_user(request: Request) -> Optional[str]:
     """Get current user from session"""
     session_id = request.cookies.get("session_id")
-    if session_id and session_id in active_sessions:
-        return active_sessions[session_id]
-    return None
+    if not session_id:
+        return None
+    session = _verify_session(session_id)
+    if session is None:
+        return None
+    username, generation, _expires_at = session
+    # Checked on every request (not cached) so a logout revokes sessions in every worker at once
+    if generation != await _session_generation(username):
+        return None
+    return username
+
+async def end_session(session_id: Optional[str]) -> None:
+    """Revoke every session of the cookie's user (on logout)"""
+    if not session_id:
+        return
+    session = _verify_session(session_id)
+    _validated_sessions.pop(session_id, None)
+    # Only a validly signed cookie can revoke, so nobody can log other users out
+    if session is None:
+        return
+    username = session[0]
+    if redis_client is not None:
+        await redis_client.incr(_generation_key(username))
+    else:
+        _local_generations[username] = _local_generations.get(username, 0) + 1
 
-def create_session(username: str) -> str:
+async def create_session(username: str) -> str:
     """Create a new session for user"""
-    session_id = secrets.token_urlsafe(32)
-    active_sessions[session_id] = username
-    return session_id
+    generation = await _session_generation(username)
+    nonce = base64.urlsafe_b64encode(os.urandom(_TOKEN_BYTES)).rstrip(b"=").decode("ascii")
+    return _session_signer.sign(f"{username}:{generation}:{nonce}").decode("ascii")
 
-def require_login(request: Request) -> str:
+async def require_login(request: Request) -> str:
     """Dependency to require login"""
-    user = get_current_user(request)
+    user = await get_current_user(request)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_302_FOUND,
@@ -31,5 +119,19 @@ def require_login(request: Request) -> str:
     return user
 
 def authenticate_user(username: str, password: str) -> bool:
-    """Authenticate user credentials"""
-    return username in USERS and USERS[username]["password"] == password 
\ No newline at end of file
+    """Authenticate user credentials (blocks for the argon2 verify; call from a worker thread)"""
+    digest = _credential_digest(username, password)
+    with _rejected_logins_lock:
+        if digest in _rejected_logins:
+            return False
+    
+    user = USERS.get(username)
+    # Verify against a dummy hash for unknown users so both paths take the same time
+    password_hash = user["password_hash"] if user is not None else _DUMMY_PASSWORD_HASH
+    try:
+        PASSWORD_HASHER.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        with _rejected_logins_lock:
+            _rejected_logins[digest] = True
+        return False
+    return user is not None
@@ -1,11 +1,36 @@
-import json
+import functools
 import os
-from typing import Dict
+import secrets
+import types
+from pathlib import Path
+from typing import Dict, Tuple
+import msgspec
+import numpy as np
+from argon2 import PasswordHasher
+from models import DimensionKeys, QuestionFile, QuestionItem, RecommendationsFile, MaturityFramework, SurveyFile
 
 # Debug mode configuration (set to False for production)
 DEBUG_MODE = os.getenv("DEBUG_MODE", "true").lower() == "true"
 DEBUG_DEFAULT_SCORE = int(os.getenv("DEBUG_DEFAULT_SCORE", "3"))  # Default to "3" (Neither agree nor disagree)
 
+# Session configuration (sessions are signed cookies; Redis is used for shared caches and reports)
+REDIS_URL = os.getenv("REDIS_URL")
+SESSION_TTL = 3600  # Seconds, matches the session cookie max_age
+# SESSION_SECRET_KEY is required unless DEBUG_MODE is on. The debug-only random fallback logs
+# everyone out on restart. It is shared between workers only when gunicorn preloads the app
+# (preload_app in gunicorn.conf.py); under uvicorn --workers each worker generates its own,
+# so sessions break whenever a request reaches another worker
+SESSION_SECRET_KEY = os.getenv("SESSION_SECRET_KEY")
+if not SESSION_SECRET_KEY:
+    if not DEBUG_MODE:
+        raise RuntimeError("SESSION_SECRET_KEY must be set when DEBUG_MODE is false")
+    SESSION_SECRET_KEY = secrets.token_urlsafe(32)
+
+# PDF rendering: "weasyprint" (default, no browser process) or "chromium" (Playwright, full browser fidelity)
+PDF_RENDERER = os.getenv("PDF_RENDERER", "weasyprint").lower()
+# Maximum number of PDFs rendered at once per worker
+PDF_CONCURRENCY = int(os.getenv("PDF_CONCURRENCY", "4"))
+
 # Simple user database (in production, use a proper database)
 USERS = {
     "faiz": {
@@ -18,95 +43,126 @@ USERS = {
     }
 }
 
-def load_questions() -> Dict:
+# Replace plaintext passwords with argon2 hashes at import so they are never compared directly
+PASSWORD_HASHER = PasswordHasher()
+for _user in USERS.values():
+    _user["password_hash"] = PASSWORD_HASHER.hash(_user.pop("password"))
+
+# Expose a read-only view so the user table cannot be rebound or extended at runtime
+USERS = types.MappingProxyType(USERS)
+
+@functools.lru_cache(maxsize=1)
+def load_questions() -> QuestionFile:
     """Load questions from questions.json file"""
     try:
         # Try to load the complete questions file first
-        with open("questions (1).json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
+        return msgspec.json.decode(Path("questions (1).json").read_bytes(), type=QuestionFile)
+    except (FileNotFoundError, msgspec.DecodeError):
         try:
             # Fallback to original questions.json
-            with open("questions.json", "r", encoding="utf-8") as f:
-                return json.load(f)
-        except FileNotFoundError:
+            return msgspec.json.decode(Path("questions.json").read_bytes(), type=QuestionFile)
+        except (FileNotFoundError, msgspec.DecodeError):
             # Fallback questions if no file found
-            return {
-                "questionnaireReference": [
-                    {"questionId": "Q01", "dimension": "Sustainability Leadership", "element": "Leadership", "question": "Sustainability is a priority for my Leadership committee"}
+            return QuestionFile(
+                questionnaireReference=[
+                    QuestionItem(questionId="Q01", dimension="Sustainability Leadership", element="Leadership", question="Sustainability is a priority for my Leadership committee")
                 ],
-                "responses": {
+                responses={
                     "1": "Resist - Minimal or no sustainability practices, reactive approach",
                     "2": "Comply - Basic regulatory compliance, limited proactive measures",
                     "3": "Optimize - Proactive sustainability improvements, some integration into business",
                     "4": "Reinvent - Sustainability as core business driver, comprehensive approach",
                     "5": "Lead - Industry leadership in sustainability, market shaping activities"
                 }
-            }
+            )
 
-# Load questions at startup
-QUESTIONS_DATA = load_questions()
-
-def load_recommendations() -> Dict:
+@functools.lru_cache(maxsize=1)
+def load_recommendations() -> RecommendationsFile:
     """Load recommendations from recommendations.json file"""
     try:
-        with open("recommendations.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"maturity_framework": {"levels": {}}, "mini_reports": []}
+        return msgspec.json.decode(Path("recommendations.json").read_bytes(), type=RecommendationsFile)
+    except (FileNotFoundError, msgspec.DecodeError):
+        return RecommendationsFile(maturity_framework=MaturityFramework(), mini_reports=[])
 
-def load_survey_data() -> Dict:
+@functools.lru_cache(maxsize=1)
+def load_survey_data() -> SurveyFile:
     """Load survey data from survey_data.json file"""
     try:
-        with open("survey_data.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"industry_averages": [], "companies": {}}
+        return msgspec.json.decode(Path("survey_data.json").read_bytes(), type=SurveyFile)
+    except (FileNotFoundError, msgspec.DecodeError):
+        return SurveyFile(industry_averages=[], companies={})
+
+@functools.lru_cache(maxsize=1)
+def build_questions_index() -> Dict[str, QuestionItem]:
+    """Questions keyed by questionId, in questionnaire order"""
+    return {question.questionId: question for question in load_questions().questionnaireReference}
+
+@functools.lru_cache(maxsize=1)
+def build_question_dimensions() -> Tuple[Tuple[str, str], ...]:
+    """(questionId, dimension) pairs in questionnaire order, for tight scoring loops"""
+    return tuple((question.questionId, question.dimension) for question in load_questions().questionnaireReference)
+
+@functools.lru_cache(maxsize=1)
+def build_dimension_index() -> Tuple[Dict[str, int], Tuple[str, ...], np.ndarray]:
+    """Question positions, dimension names and a per-question dimension code array for vectorised scoring"""
+    question_positions = {question_id: position for position, (question_id, _) in enumerate(build_question_dimensions())}
+    # Dimensions in order of first appearance, so averages keep questionnaire order
+    dimension_names = tuple(dict.fromkeys(dimension for _, dimension in build_question_dimensions()))
+    dimension_codes = {dimension: code for code, dimension in enumerate(dimension_names)}
+    question_dimension_codes = np.array([dimension_codes[dimension] for _, dimension in build_question_dimensions()], dtype=np.intp)
+    return question_positions, dimension_names, question_dimension_codes
 
-# Load data at startup
-RECOMMENDATIONS_DATA = load_recommendations()
-SURVEY_DATA = load_survey_data()
+@functools.lru_cache(maxsize=1)
+def build_recommendations_index() -> Dict[Tuple[str, str], str]:
+    """Recommendations keyed by (dimension name, maturity level)"""
+    index = {}
+    seen_names = set()
+    for report in load_recommendations().mini_reports:
+        # The first mini report for a dimension is the one used, as with a linear scan
+        if report.name not in seen_names:
+            seen_names.add(report.name)
+            index.update(((report.name, maturity_level), recommendation) for maturity_level, recommendation in report.recommendations.items())
+    return index
+
+@functools.lru_cache(maxsize=1)
+def count_questions() -> int:
+    """Number of questions in the questionnaire"""
+    return len(build_questions_index())
+
+# Reference data is parsed on first access and cached for the life of the process.
+# Read it as config.QUESTIONS_DATA at call time: a module-level
+# "from config import QUESTIONS_DATA" would trigger the parse at import.
+_LAZY_DATA = {
+    "QUESTIONS_DATA": load_questions,
+    "RECOMMENDATIONS_DATA": load_recommendations,
+    "SURVEY_DATA": load_survey_data,
+    "QUESTIONS_INDEX": build_questions_index,
+    "QUESTION_DIMENSIONS": build_question_dimensions,
+    "DIMENSION_INDEX": build_dimension_index,
+    "RECOMMENDATIONS_INDEX": build_recommendations_index,
+    "TOTAL_QUESTIONS": count_questions
+}
+
+def __getattr__(name: str):
+    """Resolve reference data attributes lazily (PEP 562)"""
+    if name in _LAZY_DATA:
+        return _LAZY_DATA[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Dimension mapping to handle naming inconsistencies between files
 DIMENSION_MAPPING = {
-    "Sustainability Leadership": {
-        "survey_key": "sustainability_leadership",
-        "chart_key": "sustainability_leadership"
-    },
-    "Organization": {
-        "survey_key": "organization", 
-        "chart_key": "organization"
-    },
-    "Sustainability Risk Management": {
-        "survey_key": "sustainability_risk_mgmt",
-        "chart_key": "sustainability_risk_management"
-    },
-    "Data & Systems": {
-        "survey_key": "data_systems",
-        "chart_key": "data_systems"
-    },
-    "People & Competency": {
-        "survey_key": "people_costs",
-        "chart_key": "people_competency"
-    },
-    "Asset Management": {
-        "survey_key": "asset_management",
-        "chart_key": "direct_asset_management"
-    },
-    "Product Management": {
-        "survey_key": "design_customers",
-        "chart_key": "product_management"
-    },
-    "Vendor Management": {
-        "survey_key": "vendor_management",
-        "chart_key": "vendor_management"
-    },
-    "Metrics & Reporting": {
-        "survey_key": "metrics_reporting",
-        "chart_key": "metrics_reporting"
-    },
-    "Managing Change": {
-        "survey_key": "managing_change",
-        "chart_key": "managing_change"
-    }
-} 
\ No newline at end of file
+    "Sustainability Leadership": DimensionKeys(survey_key="sustainability_leadership", chart_key="sustainability_leadership"),
+    "Organization": DimensionKeys(survey_key="organization", chart_key="organization"),
+    "Sustainability Risk Management": DimensionKeys(survey_key="sustainability_risk_mgmt", chart_key="sustainability_risk_management"),
+    "Data & Systems": DimensionKeys(survey_key="data_systems", chart_key="data_systems"),
+    "People & Competency": DimensionKeys(survey_key="people_costs", chart_key="people_competency"),
+    "Asset Management": DimensionKeys(survey_key="asset_management", chart_key="direct_asset_management"),
+    "Product Management": DimensionKeys(survey_key="design_customers", chart_key="product_management"),
+    "Vendor Management": DimensionKeys(survey_key="vendor_management", chart_key="vendor_management"),
+    "Metrics & Reporting": DimensionKeys(survey_key="metrics_reporting", chart_key="metrics_reporting"),
+    "Managing Change": DimensionKeys(survey_key="managing_change", chart_key="managing_change")
+}
+
+# Flat lookups derived from DIMENSION_MAPPING for hot paths (one dict probe per access)
+DIMENSION_SURVEY_KEYS = {dimension: keys.survey_key for dimension, keys in DIMENSION_MAPPING.items()}
+DIMENSION_CHART_KEYS = {dimension: keys.chart_key for dimension, keys in DIMENSION_MAPPING.items()}
@@ -0,0 +1,25 @@
+"""Gunicorn settings for production: gunicorn main:app -c gunicorn.conf.py"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# Async workers: one event loop per core is enough (blocking work already runs in threads).
+# uvicorn[standard] brings uvloop and httptools, which UvicornWorker picks up automatically
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Import the app once in the master so workers share the argon2-hashed user table, compiled
+# regexes and templates copy-on-write. In debug mode this also gives every worker the same
+# fallback SESSION_SECRET_KEY (uvicorn --workers does not; see config.py); outside debug mode
+# it must be set. Redis, Playwright and the chart warm-up are started per worker in the lifespan
+preload_app = True
+
+# Behind a reverse proxy: trust its X-Forwarded-* headers, and leave request logging to it
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+accesslog = None
+
+# PDF renders can take a while on a cold worker
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
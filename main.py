@@ -1,25 +1,100 @@
+import asyncio
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import asynccontextmanager
+from pathlib import Path
+import plotly
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from playwright.async_api import async_playwright
+from dotenv import load_dotenv
 
-# Initialize Kaleido Chrome for chart generation
-import kaleido
-kaleido.get_chrome_sync()
+# .env is read once, here, before any app module reads its settings from the environment
+load_dotenv()
 
 from routes.auth_routes import router as auth_router
 from routes.questionnaire_routes import router as questionnaire_router
+from routes.utility_routes import router as utility_router
+from config import PDF_CONCURRENCY, PDF_RENDERER
+from services.redis_client import redis_client
+from services.chart_service import warm_chart_renderer
+from services.openai_service import close_http_clients
+
+def start_log_listener() -> QueueListener:
+    """Send app log records through a queue so handlers only enqueue; a background thread writes them out"""
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root_logger = logging.getLogger()
+    root_logger.handlers[:] = [QueueHandler(log_queue)]
+    root_logger.setLevel(logging.INFO)
+    # httpx logs every OpenAI request at INFO; keep only its warnings
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Connect shared clients at startup and release them on shutdown"""
+    # Started per worker: the listener thread would not survive gunicorn's fork after preload
+    log_listener = start_log_listener()
+    if redis_client is not None:
+        await redis_client.ping()
+    # Warm up the chart renderer in the background so the server can start accepting requests
+    app.state.chart_warmup = asyncio.create_task(asyncio.to_thread(warm_chart_renderer))
+    # With the Chromium PDF renderer, one browser instance serves every download
+    app.state.playwright = None
+    app.state.browser = None
+    if PDF_RENDERER == "chromium":
+        app.state.playwright = await async_playwright().start()
+        # /dev/shm is tiny in most containers; let Chromium use /tmp instead
+        app.state.browser = await app.state.playwright.chromium.launch(args=["--disable-dev-shm-usage"])
+    app.state.pdf_semaphore = asyncio.Semaphore(PDF_CONCURRENCY)
+    yield
+    if app.state.browser is not None:
+        await app.state.browser.close()
+        await app.state.playwright.stop()
+    await close_http_clients()
+    if redis_client is not None:
+        await redis_client.aclose()
+    log_listener.stop()
 
 app = FastAPI(
     title="FastAPI Login & Questionnaire",
     description="A FastAPI application with login and questionnaire functionality",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Compress report HTML and JSON responses; tiny responses are not worth the overhead
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+class CachedStaticFiles(StaticFiles):
+    """Static files served with a Cache-Control header (Starlette already adds ETag/Last-Modified)"""
+
+    # Asset names are not content-hashed, so browsers revalidate daily instead of caching forever
+    cache_control = "public, max-age=86400"
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("Cache-Control", self.cache_control)
+        return response
+
+# Mount static files (in production, let the reverse proxy serve /static directly, see README)
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
+# plotly.js is served from the installed plotly package, so the browser runs the release the figure JSON was built with
+app.mount("/vendor/plotly", CachedStaticFiles(directory=Path(plotly.__file__).parent / "package_data"), name="plotly")
 
 # Include routers
 app.include_router(auth_router, tags=["authentication"])
 app.include_router(questionnaire_router, tags=["questionnaire"])
+app.include_router(utility_router, tags=["utility"])
 
 if __name__ == "__main__":
     import uvicorn
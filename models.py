@@ -1,3 +1,5 @@
+from typing import Dict, List, NamedTuple
+import msgspec
 from pydantic import BaseModel
 
 class SpiderChartModel(BaseModel):
@@ -10,4 +12,51 @@ class SpiderChartModel(BaseModel):
     product_management: int
     vendor_management: int
     metrics_reporting: int
-    managing_change: int 
\ No newline at end of file
+    managing_change: int
+
+class PackedScores(BaseModel):
+    """Scores for several reports extracted in one call, in the order the reports were given"""
+    reports: List[SpiderChartModel]
+
+# Reference data files, decoded and validated once at load time
+class QuestionItem(msgspec.Struct):
+    questionId: str
+    dimension: str
+    element: str
+    question: str
+
+class QuestionFile(msgspec.Struct):
+    questionnaireReference: List[QuestionItem]
+    responses: Dict[str, str]
+
+class MaturityLevel(msgspec.Struct):
+    level: int
+    score_range: str
+    description: str
+
+class MaturityFramework(msgspec.Struct):
+    levels: Dict[str, MaturityLevel] = {}
+
+class MiniReport(msgspec.Struct):
+    id: int
+    name: str
+    category: str
+    recommendations: Dict[str, str]
+
+class RecommendationsFile(msgspec.Struct):
+    maturity_framework: MaturityFramework
+    mini_reports: List[MiniReport]
+
+class IndustryAverage(msgspec.Struct):
+    id: int
+    name: str
+    industry_average: float
+
+class SurveyFile(msgspec.Struct):
+    industry_averages: List[IndustryAverage]
+    companies: Dict[str, Dict[str, float]]
+
+class DimensionKeys(NamedTuple):
+    """Keys used for a dimension in survey_data.json and in SpiderChartModel"""
+    survey_key: str
+    chart_key: str
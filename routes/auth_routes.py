@@ -1,10 +1,11 @@
+import asyncio
 from fastapi import APIRouter, Request, Form, status
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from auth import authenticate_user, create_session
+from auth import authenticate_user, create_session, end_session
+from config import SESSION_TTL
+from templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def root():
@@ -19,17 +20,19 @@ async def login_page(request: Request):
 @router.post("/login")
 async def login(username: str = Form(...), password: str = Form(...)):
     """Handle login form submission"""
-    if authenticate_user(username, password):
-        session_id = create_session(username)
+    # argon2 verification is deliberately slow and memory-hard, so it runs off the event loop
+    if await asyncio.to_thread(authenticate_user, username, password):
+        session_id = await create_session(username)
         response = RedirectResponse(url="/questionnaire", status_code=status.HTTP_302_FOUND)
-        response.set_cookie(key="session_id", value=session_id, httponly=True, max_age=3600)
+        response.set_cookie(key="session_id", value=session_id, httponly=True, max_age=SESSION_TTL)
         return response
     else:
         return RedirectResponse(url="/login?error=Invalid username or password", status_code=status.HTTP_302_FOUND)
 
 @router.get("/logout")
-async def logout():
+async def logout(request: Request):
     """Logout user"""
+    await end_session(request.cookies.get("session_id"))
     response = RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
     response.delete_cookie("session_id")
     return response 
\ No newline at end of file
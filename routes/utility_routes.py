@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+
+router = APIRouter()
+
+@router.get("/hello")
+async def hello():
+    """Hello message"""
+    return {"message": "Hello from the FastAPI Login & Questionnaire application"}
+
+@router.get("/health")
+async def health():
+    """Health check"""
+    return {"status": "healthy"}
@@ -1,74 +1,93 @@
-import plotly.graph_objects as go
-import plotly.io as pio
-import base64
+import functools
+import io
+from operator import attrgetter
+from typing import List, Sequence, Tuple
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+import numpy as np
 from models import SpiderChartModel
 
-def create_spider_chart(scores: SpiderChartModel, company_name: str) -> str:
-    """Create a spider chart from sustainability scores and return as base64 image"""
-    
-    # Define the dimensions and their display names
-    dimensions = [
-        ('sustainability_leadership', 'Sustainability Leadership'),
-        ('organization', 'Organization Structure'),
-        ('sustainability_risk_management', 'Risk Management'),
-        ('data_systems', 'Data Systems'),
-        ('people_competency', 'People & Competency'),
-        ('direct_asset_management', 'Asset Management'),
-        ('product_management', 'Product Management'),
-        ('vendor_management', 'Vendor Management'),
-        ('metrics_reporting', 'Metrics & Reporting'),
-        ('managing_change', 'Managing Change')
-    ]
-    
-    # Extract values and labels
-    categories = [dim[1] for dim in dimensions]
-    values = [getattr(scores, dim[0]) for dim in dimensions]
-    
-    # Create the spider chart
-    fig = go.Figure()
-    
-    fig.add_trace(go.Scatterpolar(
-        r=values,
-        theta=categories,
-        fill='toself',
-        name=company_name,
-        line=dict(color='#4CAF50', width=3),
-        fillcolor='rgba(76, 175, 80, 0.3)',
-        marker=dict(size=8, color='#4CAF50')
-    ))
-    
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 5],
-                tickvals=[1, 2, 3, 4, 5],
-                ticktext=['Resist', 'Comply', 'Optimize', 'Reinvent', 'Lead'],
-                tickfont=dict(size=10),
-                gridcolor='rgba(0,0,0,0.1)'
-            ),
-            angularaxis=dict(
-                tickfont=dict(size=11),
-                rotation=90,
-                direction='clockwise'
-            ),
-            bgcolor='white'
-        ),
-        showlegend=True,
-        title=dict(
-            text=f"Sustainability Maturity Assessment - {company_name}",
-            x=0.5,
-            font=dict(size=16, color='#4CAF50')
-        ),
-        width=600,
-        height=600,
-        margin=dict(l=80, r=80, t=80, b=80),
-        paper_bgcolor='white',
-        plot_bgcolor='white'
+# Radial axis labels shared by every radar chart
+MATURITY_TICKS = [1, 2, 3, 4, 5]
+MATURITY_LABELS = ['Resist', 'Comply', 'Optimize', 'Reinvent', 'Lead']
+
+# SpiderChartModel fields and their axis labels, in chart order
+SPIDER_CHART_DIMENSIONS = (
+    ('sustainability_leadership', 'Sustainability Leadership'),
+    ('organization', 'Organization Structure'),
+    ('sustainability_risk_management', 'Risk Management'),
+    ('data_systems', 'Data Systems'),
+    ('people_competency', 'People & Competency'),
+    ('direct_asset_management', 'Asset Management'),
+    ('product_management', 'Product Management'),
+    ('vendor_management', 'Vendor Management'),
+    ('metrics_reporting', 'Metrics & Reporting'),
+    ('managing_change', 'Managing Change')
+)
+SPIDER_CHART_FIELDS = tuple(field for field, _ in SPIDER_CHART_DIMENSIONS)
+SPIDER_CHART_CATEGORIES = [label for _, label in SPIDER_CHART_DIMENSIONS]
+# Reads every chart field off a SpiderChartModel in one C-level call, in chart order
+_spider_chart_values = attrgetter(*SPIDER_CHART_FIELDS)
+
+# Raster resolution of chart PNGs: 900px across for the default size, which still prints
+# sharply at the PDF's content width (Agg render time grows with the pixel count)
+CHART_PNG_DPI = 150
+
+# (label, values, color, fill alpha, line style) for one polygon on a radar chart
+RadarSeries = Tuple[str, Sequence[float], str, float, str]
+
+@functools.lru_cache(maxsize=16)
+def _radar_angles(count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Axis angles for a radar with `count` spokes, plus the same list closed back to the start"""
+    angles = np.linspace(0, 2 * np.pi, count, endpoint=False)
+    return angles, np.append(angles, angles[0])
+
+def render_radar_png(categories: List[str], series: List[RadarSeries], title: str,
+                     width: int = 600, height: int = 600) -> bytes:
+    """Draw a radar chart with matplotlib (Agg) and return the PNG bytes"""
+    angles, closed_angles = _radar_angles(len(categories))
+
+    # A bare Figure (no pyplot) keeps no global state, so charts can render from worker threads
+    fig = Figure(figsize=(width / 100, height / 100), dpi=100, facecolor='white')
+    ax = fig.add_subplot(111, polar=True)
+    # First dimension at the top, going clockwise (matches the interactive Plotly chart)
+    ax.set_theta_offset(np.pi / 2)
+    ax.set_theta_direction(-1)
+
+    for label, values, color, fill_alpha, linestyle in series:
+        closed_values = list(values) + [values[0]]
+        ax.plot(closed_angles, closed_values, color=color, linewidth=2, linestyle=linestyle, marker='o', markersize=4, label=label)
+        ax.fill(closed_angles, closed_values, color=color, alpha=fill_alpha)
+
+    ax.set_xticks(angles)
+    ax.set_xticklabels(categories, fontsize=8)
+    ax.set_ylim(0, 5)
+    ax.set_yticks(MATURITY_TICKS)
+    ax.set_yticklabels(MATURITY_LABELS, fontsize=7, color='#666666')
+    ax.grid(color=(0, 0, 0, 0.1))
+    ax.set_title(title, color='#4CAF50', fontsize=11, pad=20)
+    ax.legend(loc='upper center', bbox_to_anchor=(0.5, -0.08), ncol=len(series), frameon=False, fontsize=8)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=CHART_PNG_DPI, bbox_inches='tight')
+    return buffer.getvalue()
+
+def warm_chart_renderer() -> None:
+    """Render a throwaway chart so fonts and the Agg backend are loaded before the first request"""
+    render_radar_png(['a', 'b', 'c'], [('warm-up', [1, 1, 1], '#4CAF50', 0.3, 'solid')], 'warm-up')
+
+@functools.lru_cache(maxsize=128)
+def _spider_chart_png(company_name: str, values: Tuple[int, ...]) -> bytes:
+    """PNG for one company's scores; identical score tuples reuse the earlier render"""
+    return render_radar_png(
+        SPIDER_CHART_CATEGORIES,
+        [(company_name, values, '#4CAF50', 0.3, 'solid')],
+        f"Sustainability Maturity Assessment - {company_name}"
     )
-    
-    # Convert to base64 image
-    img_bytes = pio.to_image(fig, format="png", width=600, height=600, scale=2)
-    img_base64 = base64.b64encode(img_bytes).decode()
-    
-    return img_base64 
\ No newline at end of file
+
+def create_spider_chart(scores: SpiderChartModel, company_name: str) -> bytes:
+    """Create a spider chart from sustainability scores and return the PNG bytes"""
+
+    # Draw (or reuse) the spider chart
+    return _spider_chart_png(company_name, _spider_chart_values(scores))
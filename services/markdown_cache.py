@@ -0,0 +1,61 @@
+import asyncio
+import hashlib
+import threading
+from cachetools import LRUCache
+import markdown
+from services.redis_client import redis_client
+
+MARKDOWN_EXTENSIONS = ['markdown.extensions.tables', 'markdown.extensions.fenced_code', 'markdown.extensions.toc']
+
+# Rendered HTML is kept for a day in Redis; reports never change once generated
+RENDERED_HTML_TTL = 86400
+
+# Markdown instances are built once per worker thread instead of once per conversion
+_converters = threading.local()
+
+# Process-local L1 in front of the shared Redis L2, keyed by content digest
+_html_cache = LRUCache(maxsize=256)
+_html_cache_lock = threading.Lock()
+
+def strip_markdown_fence(markdown_content: str) -> str:
+    """Remove a surrounding ```markdown code fence if present"""
+    processed_content = markdown_content.strip()
+    if processed_content.startswith("```markdown"):
+        processed_content = processed_content.removeprefix("```markdown").strip()
+        processed_content = processed_content.removesuffix("```").strip()
+    return processed_content
+
+def _converter() -> markdown.Markdown:
+    """This thread's Markdown instance (instances keep parser state, so threads don't share one)"""
+    converter = getattr(_converters, "markdown", None)
+    if converter is None:
+        converter = _converters.markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    return converter
+
+def _convert(markdown_content: str) -> str:
+    """Strip the fence and convert markdown to HTML"""
+    converter = _converter()
+    # reset() clears per-document state (e.g. toc anchors) while keeping the loaded extensions
+    converter.reset()
+    return converter.convert(strip_markdown_fence(markdown_content))
+
+async def render(markdown_content: str) -> str:
+    """Render report markdown to HTML, reusing earlier renders of the same content"""
+    key = hashlib.blake2b(markdown_content.encode("utf-8"), digest_size=16).hexdigest()
+    with _html_cache_lock:
+        html_content = _html_cache.get(key)
+    if html_content is not None:
+        return html_content
+
+    cached_html = await redis_client.get(f"md:{key}") if redis_client is not None else None
+    if cached_html is not None:
+        html_content = cached_html.decode("utf-8")
+    else:
+        # Conversion is CPU-bound, so it runs in a worker thread
+        html_content = await asyncio.to_thread(_convert, markdown_content)
+        if redis_client is not None:
+            await redis_client.setex(f"md:{key}", RENDERED_HTML_TTL, html_content)
+
+    with _html_cache_lock:
+        _html_cache[key] = html_content
+    return html_content
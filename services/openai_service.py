@@ -1,201 +1,559 @@
-"""
-OpenAI Service with MCP Tavily Integration for Sustainability Analysis
-
-This module provides OpenAI-powered sustainability analysis with real-time web search
-capabilities using the MCP (Model Context Protocol) Tavily integration.
-
-MCP Tavily Integration Overview:
-===============================
-
-The MCP Tavily integration allows this service to perform real-time web searches
-for company sustainability information, ESG practices, and environmental data.
-
-Key Features:
-- Real-time sustainability and ESG data search
-- Industry-specific domain filtering
-- Advanced search depth for comprehensive analysis
-- Integration with OpenAI function calling for agent workflows
-
-Setup Instructions:
-==================
-
-1. Ensure MCP Tavily tools are available in your environment
-2. Configure your Tavily API key as environment variable: TAVILY_API_KEY
-3. The integration uses the following MCP tools:
-   - mcp_Tavily_Expert_tavily_search_tool
-   - mcp_Tavily_Expert_tavily_extract_tool (optional)
-
-Usage Example:
-=============
-
-# Direct MCP search call:
-result = mcp_Tavily_Expert_tavily_search_tool(
-    what_is_your_intent="Searching for sustainability information",
-    query="Tesla sustainability initiatives ESG practices",
-    search_depth="advanced",
-    max_results=5,
-    include_answer=True,
-    include_domains=["reuters.com", "bloomberg.com", "sustainablebrands.com"],
-    exclude_domains=["wikipedia.org"]
+"""OpenAI and Tavily services for sustainability analysis (see openai_service.README.md)"""
+
+import asyncio
+import orjson
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from cachetools import LRUCache, TTLCache
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from models import PackedScores, SpiderChartModel
+from config import DIMENSION_MAPPING
+from services.redis_client import redis_client
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Initialize the OpenAI client (every call is made from the event loop)
+# The SDK retries rate-limit (429) and transient 5xx errors with exponential backoff, honouring Retry-After
+OPENAI_MAX_RETRIES = 5
+# One explicitly sized keep-alive pool per process, so calls after the first skip the TCP/TLS handshake
+async_client = AsyncOpenAI(
+    max_retries=OPENAI_MAX_RETRIES,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        timeout=httpx.Timeout(60.0, connect=5.0)
+    )
 )
 
-# Using the wrapper functions in this module:
-insights = get_company_sustainability_insights("Tesla", "automotive")
-
-Configuration:
-=============
-
-MCP_TAVILY_CONFIG contains default settings for:
-- Trusted sustainability domains (Reuters, Bloomberg, etc.)
-- Excluded domains (Wikipedia, etc.)  
-- Search depth and result limits
-- Answer inclusion preferences
-
-Dependencies:
-============
-- openai
-- python-dotenv
-- models (local SpiderChartModel)
-- MCP Tavily Expert tools (available in MCP environment)
-"""
-
-import json
-from openai import OpenAI
-from models import SpiderChartModel
-from dotenv import load_dotenv
-from typing import Dict
-
-load_dotenv()
-
-# Initialize OpenAI client
-client = OpenAI()
-
-# Remove the direct Tavily client initialization since we'll use MCP
-# tavily_client = TavilyClient()
-
-def extract_sustainability_scores(markdown_content: str) -> SpiderChartModel:
-    """Extract sustainability dimension scores from Langflow markdown using OpenAI"""
-    
-    prompt = f"""
-    Please analyze the following sustainability assessment report and extract the numerical scores for each dimension. 
-    The scores should be on a scale of 1-5, where:
-    - 1 = Resist - Minimal or no sustainability practices
-    - 2 = Comply - Basic regulatory compliance
-    - 3 = Optimize - Proactive sustainability improvements
-    - 4 = Reinvent - Sustainability as core business driver
-    - 5 = Lead - Industry leadership in sustainability
-    
-    Extract scores for these exact dimensions:
-    - sustainability_leadership
-    - organization
-    - sustainability_risk_management
-    - data_systems
-    - people_competency
-    - direct_asset_management
-    - product_management
-    - vendor_management
-    - metrics_reporting
-    - managing_change
-    
-    If a specific dimension is not mentioned, estimate based on related content and context.
-    
-    Return your response in JSON format matching this structure:
-    {{
-        "sustainability_leadership": 5,
-        "organization": 4,
-        "sustainability_risk_management": 3,
-        "data_systems": 2,
-        "people_competency": 4,
-        "direct_asset_management": 3,
-        "product_management": 2,
-        "vendor_management": 3,
-        "metrics_reporting": 4,
-        "managing_change": 3
-    }}
-    
-    Assessment Report:
-    {markdown_content}
-    """
+# Tavily search API, called over one pooled HTTP/2 client per process so concurrent
+# searches reuse connections instead of opening one each
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+_tavily_client = httpx.AsyncClient(
+    http2=True,
+    timeout=15,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+)
+
+# Company news changes over days, so search results are reused for six hours:
+# per process (read and written only on the event loop) and across workers through Redis
+TAVILY_CACHE_TTL = 6 * 3600
+_search_cache = TTLCache(maxsize=2048, ttl=TAVILY_CACHE_TTL)
+
+# Structured outputs enforce the SpiderChartModel schema, so a small model is enough
+SCORE_EXTRACTION_MODEL = "gpt-4o-mini"
+# The reply is ten small integers in a fixed JSON object (~120 tokens)
+SCORE_EXTRACTION_MAX_TOKENS = 200
+
+# Extracted scores keyed by a digest of the report markdown, so re-rendering the same
+# report (report page, then PDF download) does not pay for a second OpenAI call
+_score_cache = LRUCache(maxsize=256)
+_score_cache_lock = threading.Lock()
+# Extracted scores are also shared between workers through Redis
+SCORE_CACHE_TTL = 7 * 24 * 3600
+
+def _content_digest(text: str) -> str:
+    """Short, stable cache key for a block of text"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+# Executive summaries and company insights are sampled (temperature 0.7), so the cache pins one
+# sample per prompt: identical requests (re-running a company's report) reuse the earlier reply
+# for a day, per process and across workers through Redis
+_completion_cache = LRUCache(maxsize=256)
+COMPLETION_CACHE_TTL = 24 * 3600
+
+def _completion_cache_key(request: dict) -> str:
+    """Cache key for a chat completion request (model, sampling options and messages)"""
+    return _content_digest(orjson.dumps(request, option=orjson.OPT_SORT_KEYS).decode("utf-8"))
+
+async def _cached_completion(cache_key: str) -> Optional[str]:
+    """Reply text cached for an identical completion request, if any"""
+    text = _completion_cache.get(cache_key)
+    if text is None and redis_client is not None:
+        cached_text = await redis_client.get(f"completion:{cache_key}")
+        if cached_text is not None:
+            text = _completion_cache[cache_key] = cached_text.decode("utf-8")
+    return text
+
+async def _store_completion(cache_key: str, text: str) -> None:
+    """Cache the reply text for a completion request"""
+    _completion_cache[cache_key] = text
+    if redis_client is not None:
+        await redis_client.setex(f"completion:{cache_key}", COMPLETION_CACHE_TTL, text)
+
+# Only the report sections that talk about scores are sent for extraction
+SCORE_SECTION_MAX_CHARS = 6000
+_HEADING_SPLIT_RE = re.compile(r'^(?=#{1,6}\s)', re.M)
+_SCORE_HEADING_RE = re.compile(
+    "|".join([re.escape(dimension) for dimension in DIMENSION_MAPPING] + ["score", "maturity", "dimension"]),
+    re.I
+)
+
+def _dimension_score_pattern(dimension: str) -> re.Pattern:
+    """Match an explicit '<dimension>: N/5' style score (tolerates '&' vs 'and' and punctuation)"""
+    label = r"\W+(?:and\W+)?".join(re.findall(r"\w+", dimension))
+    # Scores and the denominator may be decimals ('3.5/5.0'), but '4/50' or '3/5.5' are not out of 5
+    return re.compile(rf"{label}\D{{0,40}}?([1-5](?:\.\d+)?)\s*(?:/|out of)\s*5(?:\.0+)?(?!\.?\d)", re.I)
+
+# Reports that state every score explicitly are parsed without calling OpenAI
+_DIMENSION_SCORE_PATTERNS = {
+    keys.chart_key: _dimension_score_pattern(dimension) for dimension, keys in DIMENSION_MAPPING.items()
+}
+
+def _regex_scores(markdown_content: str):
+    """Scores parsed straight from the report, or None unless all dimensions are stated"""
+    scores = {}
+    for field, pattern in _DIMENSION_SCORE_PATTERNS.items():
+        match = pattern.search(markdown_content)
+        if match is None:
+            return None
+        # Rounded like create_spider_chart_model rounds questionnaire scores, kept within 1-5
+        scores[field] = min(5, max(1, int(round(float(match.group(1))))))
+    return SpiderChartModel(**scores)
+
+def _extract_score_section(markdown_content: str) -> str:
+    """Keep the sections whose heading names a dimension or scores, capped in length"""
+    sections = _HEADING_SPLIT_RE.split(markdown_content)
+    relevant = [section for section in sections if _SCORE_HEADING_RE.search(section.split("\n", 1)[0])]
+    # Reports without matching headings are sent as-is (still capped)
+    trimmed = "".join(relevant) if relevant else markdown_content
+    return trimmed[:SCORE_SECTION_MAX_CHARS]
+
+# Static instructions go first and identical on every call, so OpenAI's automatic prompt
+# caching can reuse the prefix; only the report (or company data) varies, and it comes last
+SCORE_EXTRACTION_SYSTEM_PROMPT = f"""You are an expert sustainability analyst. Extract precise numerical scores from sustainability assessment reports.
+
+Extract the numerical score for each sustainability dimension in the assessment report you are given.
+Scores are on a scale of 1-5: 1 = Resist, 2 = Comply, 3 = Optimize, 4 = Reinvent, 5 = Lead.
+If a dimension is not mentioned, estimate it from related content and context.
+
+Dimensions: {", ".join(DIMENSION_MAPPING)}"""
+
+# Folded into every score cache key, so changing the model or instructions never serves stale scores
+_SCORE_REQUEST_DIGEST = _content_digest(f"{SCORE_EXTRACTION_MODEL}\0{SCORE_EXTRACTION_SYSTEM_PROMPT}")
+
+def _score_cache_key(score_section: str) -> str:
+    """Cache key for one score extraction request (model, instructions and the report text sent)"""
+    # Keyed on the trimmed score sections, not the whole report, so revisions that only touch
+    # prose outside those sections (e.g. a refreshed company profile) reuse the earlier scores
+    return _content_digest(f"{_SCORE_REQUEST_DIGEST}\0{score_section}")
+
+# Only the report is appended per call
+_SCORE_PROMPT_PREFIX = "Assessment Report:\n"
+
+def _prompt_cache_options(prompt_name: str) -> dict:
+    """Request options routing calls that share a static prompt prefix to the same prompt cache"""
+    return {"extra_body": {"prompt_cache_key": prompt_name}}
+
+def _score_extraction_messages(score_section: str) -> list:
+    """Chat messages asking the model to extract dimension scores from a report's score sections"""
+    return [
+        {"role": "system", "content": SCORE_EXTRACTION_SYSTEM_PROMPT},
+        {"role": "user", "content": _SCORE_PROMPT_PREFIX + score_section}
+    ]
+
+def _cached_scores(cache_key: str):
+    """Previously extracted scores for a report digest, if any"""
+    with _score_cache_lock:
+        cached_scores = _score_cache.get(cache_key)
+    return SpiderChartModel.model_validate_json(cached_scores) if cached_scores is not None else None
+
+def _parsed_reply(response):
+    """The schema-validated object from a structured-output reply"""
+    parsed = response.choices[0].message.parsed
+    if parsed is None:
+        raise ValueError(f"No scores returned: {response.choices[0].message.refusal}")
+    return parsed
+
+async def _store_scores(cache_key: str, scores: SpiderChartModel) -> None:
+    """Cache extracted scores for this process and, through Redis, for the other workers"""
+    # Only successful extractions are cached (as JSON, the same bytes Redis holds); the fallback is retried next time
+    scores_json = scores.model_dump_json()
+    with _score_cache_lock:
+        _score_cache[cache_key] = scores_json
+    if redis_client is not None:
+        await redis_client.setex(f"scores:{cache_key}", SCORE_CACHE_TTL, scores_json)
+
+async def _shared_cached_scores(cache_key: str):
+    """Scores another worker already extracted for this report digest, if any"""
+    if redis_client is None:
+        return None
+    cached_scores = await redis_client.get(f"scores:{cache_key}")
+    if cached_scores is None:
+        return None
+    with _score_cache_lock:
+        _score_cache[cache_key] = cached_scores
+    # Parse and validate in one pass through pydantic-core
+    return SpiderChartModel.model_validate_json(cached_scores)
+
+# Default scores used when extraction fails, validated once at import
+_DEFAULT_SCORES = SpiderChartModel(
+    sustainability_leadership=3,
+    organization=3,
+    sustainability_risk_management=3,
+    data_systems=3,
+    people_competency=3,
+    direct_asset_management=3,
+    product_management=3,
+    vendor_management=3,
+    metrics_reporting=3,
+    managing_change=3
+)
+
+def _fallback_scores() -> SpiderChartModel:
+    """Default scores used when extraction fails"""
+    # model_copy() skips validation, and keeps callers from sharing one mutable instance
+    return _DEFAULT_SCORES.model_copy()
+
+class _RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets that refill continuously (token buckets)"""
+    
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.available_requests = requests_per_minute
+        self.available_tokens = tokens_per_minute
+        self.last_refill = time.monotonic()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed_minutes = (now - self.last_refill) / 60
+        self.available_requests = min(self.requests_per_minute, self.available_requests + elapsed_minutes * self.requests_per_minute)
+        self.available_tokens = min(self.tokens_per_minute, self.available_tokens + elapsed_minutes * self.tokens_per_minute)
+        self.last_refill = now
+    
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request and `tokens` tokens fit the budgets, then spend them"""
+        # Requests larger than the whole token budget only wait for a full bucket
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            # Checking and spending happen without an await in between, so concurrent callers never overspend
+            self._refill()
+            if self.available_requests >= 1 and self.available_tokens >= tokens:
+                self.available_requests -= 1
+                self.available_tokens -= tokens
+                return
+            missing_minutes = max(
+                (1 - self.available_requests) / self.requests_per_minute,
+                (tokens - self.available_tokens) / self.tokens_per_minute
+            )
+            await asyncio.sleep(max(missing_minutes * 60, 0.01))
+
+def _estimated_tokens(messages: list, max_tokens: int) -> int:
+    """Rough token cost of a request (about four characters per prompt token, plus the reply cap)"""
+    return sum(len(message["content"]) for message in messages) // 4 + max_tokens
+
+async def _known_scores(markdown_content: str, cache_key: str) -> Optional[SpiderChartModel]:
+    """Scores for a report that need no OpenAI call (cached, or stated explicitly in the report)"""
+    cached_scores = _cached_scores(cache_key)
+    if cached_scores is not None:
+        return cached_scores
     
+    explicit_scores = _regex_scores(markdown_content)
+    if explicit_scores is not None:
+        return explicit_scores
+    
+    return await _shared_cached_scores(cache_key)
+
+async def extract_sustainability_scores(markdown_content: str, rate_limiter: Optional[_RateLimiter] = None) -> SpiderChartModel:
+    """Extract sustainability dimension scores from report markdown using OpenAI
+    (waiting on rate_limiter, if given, before calling the API)"""
+    
+    score_section = _extract_score_section(markdown_content)
+    cache_key = _score_cache_key(score_section)
+    known_scores = await _known_scores(markdown_content, cache_key)
+    if known_scores is not None:
+        return known_scores
+    
+    messages = _score_extraction_messages(score_section)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert sustainability analyst. Extract precise numerical scores from sustainability assessment reports."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
+        if rate_limiter is not None:
+            await rate_limiter.acquire(_estimated_tokens(messages, SCORE_EXTRACTION_MAX_TOKENS))
+        response = await async_client.beta.chat.completions.parse(
+            model=SCORE_EXTRACTION_MODEL,
+            messages=messages,
+            response_format=SpiderChartModel,
+            temperature=0,
+            max_tokens=SCORE_EXTRACTION_MAX_TOKENS,
+            **_prompt_cache_options("score-extraction")
         )
+        scores = _parsed_reply(response)
+        await _store_scores(cache_key, scores)
+        return scores
         
-        scores_json = response.choices[0].message.content
-        scores_data = json.loads(scores_json)
-        return SpiderChartModel(**scores_data)
-        
-    except Exception as e:
-        print(f"Error extracting scores with OpenAI: {e}")
+    except Exception:
+        logger.exception("Error extracting scores with OpenAI")
         # Fallback default scores if API fails
-        return SpiderChartModel(
-            sustainability_leadership=3,
-            organization=3,
-            sustainability_risk_management=3,
-            data_systems=3,
-            people_competency=3,
-            direct_asset_management=3,
-            product_management=3,
-            vendor_management=3,
-            metrics_reporting=3,
-            managing_change=3
+        return _fallback_scores()
+
+async def batch_extract_scores(markdown_contents: List[str], max_concurrency: int = 8,
+                               requests_per_minute: Optional[int] = None,
+                               tokens_per_minute: Optional[int] = None) -> List[SpiderChartModel]:
+    """Extract scores for many reports concurrently, with at most max_concurrency OpenAI calls in flight
+    and, when the account's limits are given, calls paced to stay within them"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    # Pacing to the limits keeps calls flowing at the allowed rate instead of bursting into 429 retries
+    rate_limiter = _RateLimiter(requests_per_minute, tokens_per_minute) if requests_per_minute and tokens_per_minute else None
+    
+    async def extract(markdown_content: str) -> SpiderChartModel:
+        async with semaphore:
+            return await extract_sustainability_scores(markdown_content, rate_limiter)
+    
+    # Identical reports are extracted once; completed extractions are cached, so a rerun resumes cheaply
+    unique_contents = list(dict.fromkeys(markdown_contents))
+    extracted = dict(zip(unique_contents, await asyncio.gather(*(extract(content) for content in unique_contents))))
+    return [extracted[content] for content in markdown_contents]
+
+# Reports packed into one extraction call by extract_scores_packed
+SCORE_PACK_SIZE = 5
+# The single-report instructions, plus how packed reports are laid out and answered
+SCORE_PACK_SYSTEM_PROMPT = SCORE_EXTRACTION_SYSTEM_PROMPT + """
+
+You are given several assessment reports, each under its own "### Report N" heading.
+Return one entry in `reports` per report, in the order the reports are given."""
+
+async def _extract_score_pack(pack: List[tuple], rate_limiter: Optional[_RateLimiter]) -> List[SpiderChartModel]:
+    """Extract scores for a pack of (markdown_content, score_section, cache_key) reports in one OpenAI call"""
+    messages = [
+        {"role": "system", "content": SCORE_PACK_SYSTEM_PROMPT},
+        {"role": "user", "content": "\n\n".join(
+            f"### Report {number}\n{_SCORE_PROMPT_PREFIX}{score_section}"
+            for number, (_, score_section, _) in enumerate(pack, 1)
+        )}
+    ]
+    max_tokens = SCORE_EXTRACTION_MAX_TOKENS * len(pack)
+    try:
+        if rate_limiter is not None:
+            await rate_limiter.acquire(_estimated_tokens(messages, max_tokens))
+        response = await async_client.beta.chat.completions.parse(
+            model=SCORE_EXTRACTION_MODEL,
+            messages=messages,
+            response_format=PackedScores,
+            temperature=0,
+            max_tokens=max_tokens,
+            **_prompt_cache_options("score-extraction-packed")
         )
+        packed_scores = _parsed_reply(response).reports
+        if len(packed_scores) != len(pack):
+            raise ValueError(f"Expected scores for {len(pack)} reports, got {len(packed_scores)}")
+    except Exception:
+        logger.exception("Error extracting packed scores with OpenAI, extracting reports one by one")
+        return [await extract_sustainability_scores(markdown_content, rate_limiter) for markdown_content, _, _ in pack]
+    
+    for (_, _, cache_key), scores in zip(pack, packed_scores):
+        await _store_scores(cache_key, scores)
+    return packed_scores
 
-def generate_executive_summary(user_scores: Dict[str, float], industry_averages: Dict[str, float], company_name: str) -> str:
-    """Generate an executive summary using OpenAI based on survey data and industry averages"""
-    
-    overall_score = round(sum(user_scores.values()) / len(user_scores), 2)
-    
-    # Create comparison data for prompt
-    comparison_data = []
-    for dimension, user_score in user_scores.items():
-        industry_avg = industry_averages.get(dimension, 0)
-        gap = round(user_score - industry_avg, 2)
-        comparison_data.append(f"- {dimension}: User {user_score}/5.0 vs Industry {industry_avg}/5.0 (Gap: {gap:+.2f})")
+async def extract_scores_packed(markdown_contents: List[str], pack_size: int = SCORE_PACK_SIZE,
+                                requests_per_minute: Optional[int] = None,
+                                tokens_per_minute: Optional[int] = None) -> List[SpiderChartModel]:
+    """Extract scores for many reports with one OpenAI call per pack of up to pack_size reports
+    (for accounts limited by requests per minute rather than tokens; see batch_extract_scores)"""
+    rate_limiter = _RateLimiter(requests_per_minute, tokens_per_minute) if requests_per_minute and tokens_per_minute else None
+    
+    # Cached and explicitly scored reports are answered without a call; identical reports are extracted once
+    extracted = {}
+    pending = []
+    for markdown_content in dict.fromkeys(markdown_contents):
+        score_section = _extract_score_section(markdown_content)
+        cache_key = _score_cache_key(score_section)
+        known_scores = await _known_scores(markdown_content, cache_key)
+        if known_scores is not None:
+            extracted[markdown_content] = known_scores
+        else:
+            pending.append((markdown_content, score_section, cache_key))
     
-    prompt = f"""
-    Generate a concise executive summary for {company_name}'s sustainability maturity assessment. 
+    packs = [pending[start:start + pack_size] for start in range(0, len(pending), pack_size)]
+    for pack, pack_scores in zip(packs, await asyncio.gather(*(_extract_score_pack(pack, rate_limiter) for pack in packs))):
+        extracted.update((markdown_content, scores) for (markdown_content, _, _), scores in zip(pack, pack_scores))
+    return [extracted[content] for content in markdown_contents]
+
+EXECUTIVE_SUMMARY_SYSTEM_PROMPT = """You are an expert sustainability consultant creating executive summaries for corporate sustainability assessments. Be concise, insightful, and actionable.
+
+Generate a concise executive summary of the company's sustainability maturity assessment from the data you are given.
+
+Requirements:
+- Maximum 5 lines
+- Professional, actionable tone
+- Focus on key insights, strengths, and priority areas
+- Mention overall maturity level and key recommendations
+- Be specific about the company's position relative to industry
+
+Return only the executive summary text, no additional formatting or headers."""
+
+# Offline re-scoring goes through the Batch API (half price, separate rate limits, results within
+# 24h); below this many reports the online batch_extract_scores is the better fit
+BULK_SCORING_MIN_REPORTS = 100
+
+def _score_response_format() -> dict:
+    """Strict JSON schema response format for SpiderChartModel, for raw (Batch API) requests"""
+    schema = SpiderChartModel.model_json_schema()
+    schema["additionalProperties"] = False
+    return {"type": "json_schema", "json_schema": {"name": "SpiderChartModel", "strict": True, "schema": schema}}
+
+async def _submit_batch(requests: Dict[str, dict], filename: str) -> str:
+    """Upload chat completion request bodies, keyed by custom_id, as one Batch API job and return the batch id"""
+    # One JSONL line per distinct request
+    payload = b"\n".join(
+        orjson.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body})
+        for custom_id, body in requests.items()
+    )
+    
+    batch_input = await async_client.files.create(file=(filename, payload), purpose="batch")
+    batch = await async_client.batches.create(
+        input_file_id=batch_input.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    return batch.id
+
+# Batch API job statuses that can still change; every other status is final
+_BATCH_PENDING_STATUSES = frozenset({"validating", "in_progress", "finalizing", "cancelling"})
+
+class BulkJobError(Exception):
+    """A Batch API job ended without completing (failed, expired or cancelled)"""
+    
+    def __init__(self, batch_id: str, status: str, errors: List[str], loaded: int):
+        self.batch_id = batch_id
+        self.status = status
+        self.errors = errors
+        # Replies the job did produce are still loaded before this is raised
+        self.loaded = loaded
+        super().__init__(f"Batch {batch_id} {status} ({loaded} replies loaded): {'; '.join(errors) or 'no error details'}")
+
+async def _load_batch(batch_id: str, load_reply) -> Optional[int]:
+    """Pass each (custom_id, reply message content) of a finished Batch API job to `await load_reply(...)`
+    and return how many it accepted (None while the job is still running). Jobs that end without
+    completing raise BulkJobError once whatever partial output they have is loaded."""
+    batch = await async_client.batches.retrieve(batch_id)
+    if batch.status in _BATCH_PENDING_STATUSES:
+        return None
     
+    loaded = 0
+    # Expired and cancelled jobs keep the output of the requests that did finish
+    if batch.output_file_id:
+        output = await async_client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            result = orjson.loads(line)
+            body = (result.get("response") or {}).get("body") or {}
+            try:
+                content = body["choices"][0]["message"]["content"]
+            except (KeyError, IndexError):
+                logger.error("Batch request %s returned no reply: %s", result.get("custom_id"), result.get("error"))
+                continue
+            if await load_reply(result["custom_id"], content):
+                loaded += 1
+    
+    if batch.status != "completed":
+        errors = [f"{error.code}: {error.message}" for error in (batch.errors.data or [])] if batch.errors else []
+        if batch.error_file_id:
+            errors.append(f"per-request errors in file {batch.error_file_id}")
+        raise BulkJobError(batch_id, batch.status, errors, loaded)
+    return loaded
+
+async def submit_bulk_scoring(markdown_contents: List[str]) -> str:
+    """Submit score extraction for many reports as one Batch API job and return the batch id"""
+    response_format = _score_response_format()
+    # One request per distinct report, keyed by its score cache key
+    requests = {
+        _score_cache_key(score_section): {
+            "model": SCORE_EXTRACTION_MODEL,
+            "messages": _score_extraction_messages(score_section),
+            "response_format": response_format,
+            "temperature": 0,
+            "max_tokens": SCORE_EXTRACTION_MAX_TOKENS
+        }
+        for score_section in map(_extract_score_section, markdown_contents)
+    }
+    return await _submit_batch(requests, "bulk_scoring.jsonl")
+
+async def poll_bulk_scoring(batch_id: str) -> Optional[int]:
+    """Load a finished bulk job's scores into the score caches and return how many were loaded
+    (None while the job is still running; BulkJobError if it failed, expired or was cancelled);
+    extract_sustainability_scores then answers from cache"""
+    
+    async def load_scores(cache_key: str, content: str) -> bool:
+        try:
+            scores = SpiderChartModel.model_validate_json(content)
+        except Exception:
+            logger.exception("Error parsing bulk scoring result %s", cache_key)
+            return False
+        # Results feed the same caches as online extraction, so later renders reuse them
+        await _store_scores(cache_key, scores)
+        return True
+    
+    return await _load_batch(batch_id, load_scores)
+
+# Per-call data for the summary; the skeleton is built once and only the fields are filled in
+_EXECUTIVE_SUMMARY_PROMPT = """
     Key Data:
     - Overall Score: {overall_score}/5.0
     - Company: {company_name}
     
     Dimension Comparison (User vs Industry Average):
-    {chr(10).join(comparison_data)}
-    
-    Requirements:
-    - Maximum 5 lines
-    - Professional, actionable tone
-    - Focus on key insights, strengths, and priority areas
-    - Mention overall maturity level and key recommendations
-    - Be specific about the company's position relative to industry
-    
-    Return only the executive summary text, no additional formatting or headers.
+    {comparison_data}
     """
+
+def _executive_summary_prompt(user_scores: Dict[str, float], industry_averages: Dict[str, float], company_name: str) -> str:
+    """User message with the company's scores and industry gaps for the executive summary"""
+    
+    overall_score = round(sum(user_scores.values()) / len(user_scores), 2)
     
+    # Create comparison data for prompt, aligned by dimension and built in a single join
+    industry_values = [industry_averages.get(dimension, 0) for dimension in user_scores]
+    comparison_data = "\n".join(
+        f"- {dimension}: User {user_score}/5.0 vs Industry {industry_avg}/5.0 (Gap: {user_score - industry_avg:+.2f})"
+        for (dimension, user_score), industry_avg in zip(user_scores.items(), industry_values)
+    )
+    
+    return _EXECUTIVE_SUMMARY_PROMPT.format(
+        overall_score=overall_score,
+        company_name=company_name,
+        comparison_data=comparison_data
+    )
+
+def fallback_executive_summary(user_scores: Dict[str, float], company_name: str) -> str:
+    """Summary used when the OpenAI call fails"""
+    overall_score = round(sum(user_scores.values()) / len(user_scores), 2)
+    return f"{company_name} achieved an overall sustainability maturity score of {overall_score}/5.0. The assessment reveals opportunities for improvement across key dimensions while highlighting areas of strength relative to industry benchmarks. Immediate focus should be placed on the lowest-scoring dimensions to accelerate sustainability maturity. Strategic investments in foundational capabilities will drive long-term competitive advantage. The company is positioned to advance its sustainability journey through targeted action plans."
+
+def _executive_summary_request(user_scores: Dict[str, float], industry_averages: Dict[str, float], company_name: str) -> dict:
+    """Chat completion request for the executive summary (sent online or through the Batch API)"""
+    return {
+        "model": "gpt-4",
+        "messages": [
+            {"role": "system", "content": EXECUTIVE_SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": _executive_summary_prompt(user_scores, industry_averages, company_name)}
+        ],
+        "max_tokens": 300,
+        "temperature": 0.7
+    }
+
+async def generate_executive_summary(user_scores: Dict[str, float], industry_averages: Dict[str, float], company_name: str) -> str:
+    """Generate an executive summary using OpenAI based on survey data and industry averages"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert sustainability consultant creating executive summaries for corporate sustainability assessments. Be concise, insightful, and actionable."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=300,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content.strip()
+        request = _executive_summary_request(user_scores, industry_averages, company_name)
+        cache_key = _completion_cache_key(request)
+        summary = await _cached_completion(cache_key)
+        if summary is None:
+            response = await async_client.chat.completions.create(
+                **request,
+                **_prompt_cache_options("executive-summary")
+            )
+            summary = response.choices[0].message.content or ""
+            if summary:
+                await _store_completion(cache_key, summary)
+        return summary.strip()
         
-    except Exception as e:
-        print(f"Error generating executive summary with OpenAI: {e}")
+    except Exception:
+        logger.exception("Error generating executive summary with OpenAI")
         # Fallback summary if API fails
-        return f"{company_name} achieved an overall sustainability maturity score of {overall_score}/5.0. The assessment reveals opportunities for improvement across key dimensions while highlighting areas of strength relative to industry benchmarks. Immediate focus should be placed on the lowest-scoring dimensions to accelerate sustainability maturity. Strategic investments in foundational capabilities will drive long-term competitive advantage. The company is positioned to advance its sustainability journey through targeted action plans." 
+        return fallback_executive_summary(user_scores, company_name)
 
 def search_company_info_mcp(query: str, max_results: int = 5) -> dict:
     """
@@ -223,12 +581,12 @@ def search_company_info_mcp(query: str, max_results: int = 5) -> dict:
         "status": "configured"
     }
 
-def call_mcp_tavily_search(query: str, max_results: int = 5) -> dict:
+def _mock_tavily_search(query: str, max_results: int = 5) -> dict:
     """
-    Direct call to MCP Tavily search tool
+    Example MCP Tavily search response
     
-    This function demonstrates how to properly call the MCP Tavily search tool.
-    In a real MCP environment, you would replace this with the actual tool call.
+    Used by call_mcp_tavily_search when TAVILY_API_KEY is not set, so the app runs without
+    Tavily credentials. The shape matches what the Tavily search API returns.
     """
     
     # EXAMPLE: How to actually use the MCP Tavily search tool
@@ -290,7 +648,46 @@ def call_mcp_tavily_search(query: str, max_results: int = 5) -> dict:
             "response_time": 1.2
         }
 
-def example_mcp_tavily_integration():
+async def call_mcp_tavily_search(query: str, max_results: int = 5) -> dict:
+    """Search Tavily for company information (example responses when TAVILY_API_KEY is not set)"""
+    if not TAVILY_API_KEY:
+        return _mock_tavily_search(query, max_results)
+    
+    # Queries differing only in case or surrounding whitespace share a cache entry
+    cache_key = _content_digest(f"{query.strip().lower()}\0{max_results}")
+    search_response = _search_cache.get(cache_key)
+    if search_response is not None:
+        return search_response
+    if redis_client is not None:
+        payload = await redis_client.get(f"tavily:{cache_key}")
+        if payload is not None:
+            search_response = _search_cache[cache_key] = orjson.loads(payload)
+            return search_response
+    
+    response = await _tavily_client.post(
+        TAVILY_SEARCH_URL,
+        json={
+            "query": query,
+            "search_depth": MCP_TAVILY_CONFIG["default_search_depth"],
+            "max_results": max_results,
+            "include_answer": MCP_TAVILY_CONFIG["include_answer"],
+            "include_domains": MCP_TAVILY_CONFIG["sustainability_domains"],
+            "exclude_domains": MCP_TAVILY_CONFIG["excluded_domains"]
+        },
+        headers={"Authorization": f"Bearer {TAVILY_API_KEY}"}
+    )
+    response.raise_for_status()
+    search_response = _search_cache[cache_key] = orjson.loads(response.content)
+    if redis_client is not None:
+        await redis_client.setex(f"tavily:{cache_key}", TAVILY_CACHE_TTL, response.content)
+    return search_response
+
+async def close_http_clients() -> None:
+    """Close the pooled OpenAI and Tavily HTTP clients (called on app shutdown)"""
+    await async_client.close()
+    await _tavily_client.aclose()
+
+async def example_mcp_tavily_integration():
     """
     Example function demonstrating how to integrate MCP Tavily search tools
     
@@ -318,19 +715,18 @@ def example_mcp_tavily_integration():
         #     exclude_domains=["wikipedia.org"]
         # )
         
-        # For demonstration, use our mock function
-        search_result = call_mcp_tavily_search(example_query, 5)
+        # Uses the Tavily API when TAVILY_API_KEY is set, example responses otherwise
+        search_result = await call_mcp_tavily_search(example_query, 5)
         
         # Step 2: Format the results for use in your application
         formatted_results = format_mcp_search_results(search_result, example_query)
         
-        print("=== MCP Tavily Integration Example ===")
-        print(formatted_results)
+        logger.info("MCP Tavily integration example results:\n%s", formatted_results)
         
         return formatted_results
         
-    except Exception as e:
-        print(f"Error in MCP Tavily integration: {e}")
+    except Exception:
+        logger.exception("Error in MCP Tavily integration")
         return None
 
 # Configuration constants for MCP Tavily integration
@@ -353,59 +749,66 @@ MCP_TAVILY_CONFIG = {
 def format_mcp_search_results(search_response: dict, query: str) -> str:
     """Format MCP Tavily search results for OpenAI consumption"""
     try:
-        formatted_results = f"Search Query: {query}\n\n"
+        parts = [f"Search Query: {query}\n\n"]
+        append = parts.append
         
         # Handle MCP response format
         if isinstance(search_response, dict):
             if search_response.get('answer'):
-                formatted_results += f"Quick Answer: {search_response['answer']}\n\n"
+                append(f"Quick Answer: {search_response['answer']}\n\n")
             
-            formatted_results += "Detailed Results:\n"
+            append("Detailed Results:\n")
             results = search_response.get('results', [])
             
             if not results and search_response.get('status') == 'configured':
                 # This is our configuration response
-                formatted_results += "MCP Tavily search integration configured successfully.\n"
-                formatted_results += f"Search parameters: {search_response.get('search_params', {})}\n"
-                return formatted_results
+                append("MCP Tavily search integration configured successfully.\n")
+                append(f"Search parameters: {search_response.get('search_params', {})}\n")
+                return "".join(parts)
             
             for i, result in enumerate(results, 1):
-                formatted_results += f"{i}. {result.get('title', 'N/A')}\n"
-                formatted_results += f"   URL: {result.get('url', 'N/A')}\n"
-                formatted_results += f"   Content: {result.get('content', 'N/A')[:500]}...\n\n"
+                append(f"{i}. {result.get('title', 'N/A')}\n")
+                append(f"   URL: {result.get('url', 'N/A')}\n")
+                append(f"   Content: {result.get('content', 'N/A')[:500]}...\n\n")
         
-        return formatted_results
+        return "".join(parts)
         
     except Exception as e:
         return f"Error formatting search results: {str(e)}"
 
-def get_company_sustainability_insights(company_name: str, industry: str = None) -> str:
-    """Get company information and generate sustainability barriers and journey predictions using OpenAI agents with MCP Tavily search"""
-    
-    # Define the search function for OpenAI function calling
-    search_function = {
-        "name": "search_company_info",
-        "description": "Search for comprehensive information about a company including their sustainability initiatives, challenges, and industry context",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "query": {
-                    "type": "string",
-                    "description": "Search query to find information about the company's sustainability practices, environmental initiatives, and challenges"
-                },
-                "max_results": {
-                    "type": "integer",
-                    "description": "Maximum number of search results to return"
-                }
-            },
-            "required": ["query"]
-        }
-    }
+INSIGHTS_SYSTEM_PROMPT = """You are an expert sustainability analyst with access to real-time web search results. Use the search results you are given to ground your analysis in comprehensive, current information about companies' sustainability practices, challenges, and industry context.
+
+When asked to research a company, draw on information about their:
+1. Current sustainability initiatives and ESG practices
+2. Environmental challenges and barriers they face
+3. Industry-specific sustainability requirements and trends
+4. Recent sustainability-related news, investments, or commitments
+5. Regulatory pressures and compliance requirements
+
+After gathering this information, provide:
+1. Four specific lines about barriers to sustainability this company likely faces
+2. Predictions about their sustainability journey over the next 3-5 years"""
+
+# Model for the company insights analysis (part of its cache key)
+COMPANY_INSIGHTS_MODEL = "gpt-4"
+
+def _company_insights_cache_key(company_name: str, industry: Optional[str]) -> str:
+    """Completion cache key for a company's insights, known before any search is run"""
+    # Keyed on the inputs rather than the full prompt: the prompt embeds search results that
+    # change between runs (and between a Batch API submission and its use up to 24h later)
+    return _completion_cache_key({
+        "model": COMPANY_INSIGHTS_MODEL,
+        "system": INSIGHTS_SYSTEM_PROMPT,
+        "company_name": company_name,
+        "industry": industry
+    })
+
+async def _company_insights_request(company_name: str, industry: str = None) -> dict:
+    """Run the company and industry searches and build the insights chat completion request"""
     
-    def search_company_info(query: str, max_results: int = 5) -> str:
+    async def search_company_info(query: str, max_results: int = 5) -> str:
         """Search for company information using MCP Tavily integration"""
-        # Use the actual MCP search call
-        search_response = call_mcp_tavily_search(query, max_results)
+        search_response = await call_mcp_tavily_search(query, max_results)
         return format_mcp_search_results(search_response, query)
     
     # Prepare the initial prompt for comprehensive company analysis
@@ -413,98 +816,68 @@ def get_company_sustainability_insights(company_name: str, industry: str = None)
     
     initial_prompt = f"""
     I need you to research {company_name}{industry_context} and provide comprehensive sustainability insights. 
-    Please search for information about their:
-    1. Current sustainability initiatives and ESG practices
-    2. Environmental challenges and barriers they face
-    3. Industry-specific sustainability requirements and trends
-    4. Recent sustainability-related news, investments, or commitments
-    5. Regulatory pressures and compliance requirements
-    
-    After gathering this information, provide:
-    1. Four specific lines about barriers to sustainability this company likely faces
-    2. Predictions about their sustainability journey over the next 3-5 years
-    
-    Start by searching for current information about {company_name}'s sustainability practices and challenges.
     """
     
-    try:
-        # First conversation - gather company information
-        messages = [
-            {"role": "system", "content": "You are an expert sustainability analyst with access to real-time web search. Use the search function to gather comprehensive, current information about companies' sustainability practices, challenges, and industry context. Always search for the most recent and relevant information before providing analysis."},
-            {"role": "user", "content": initial_prompt}
-        ]
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            functions=[search_function],
-            function_call={"name": "search_company_info"},
-            temperature=0.3
-        )
-        
-        # Handle function call
-        if response.choices[0].message.function_call:
-            function_call = response.choices[0].message.function_call
-            function_args = json.loads(function_call.arguments)
-            
-            # Execute the search
-            search_results = search_company_info(
-                query=function_args.get("query", f"{company_name} sustainability ESG environmental initiatives challenges"),
-                max_results=function_args.get("max_results", 5)
-            )
-            
-            # Add function result to conversation
-            messages.append({
-                "role": "assistant",
-                "content": None,
-                "function_call": {
-                    "name": "search_company_info",
-                    "arguments": function_call.arguments
-                }
-            })
-            messages.append({
-                "role": "function",
-                "name": "search_company_info",
-                "content": search_results
-            })
-            
-            # Get additional industry-specific search if needed
-            industry_search_query = f"{company_name} {industry} sustainability regulations compliance challenges" if industry else f"{company_name} industry sustainability trends regulations"
-            additional_search = search_company_info(industry_search_query, 3)
-            
-            # Generate final analysis with all gathered information
-            final_prompt = f"""
-            Based on the search results about {company_name}, please provide:
+    # Both searches are fixed queries, so they run concurrently (no model round-trip to pick the query)
+    company_search_query = f"{company_name} sustainability ESG environmental initiatives challenges"
+    industry_search_query = f"{company_name} {industry} sustainability regulations compliance challenges" if industry else f"{company_name} industry sustainability trends regulations"
+    search_results, additional_search = await asyncio.gather(
+        search_company_info(company_search_query, 5),
+        search_company_info(industry_search_query, 3)
+    )
+    
+    # Generate final analysis with all gathered information
+    final_prompt = f"""
+    Based on the search results about {company_name}, please provide:
 
-            **Barriers to Sustainability (exactly 4 lines):**
-            [Provide 4 specific, realistic barriers this company faces in their sustainability journey]
+    **Barriers to Sustainability (exactly 4 lines):**
+    [Provide 4 specific, realistic barriers this company faces in their sustainability journey]
 
-            **Sustainability Journey Predictions:**
-            [Provide 3-4 predictions about where this company's sustainability efforts will be in the next 3-5 years, considering industry trends, regulatory pressures, and their current position]
+    **Sustainability Journey Predictions:**
+    [Provide 3-4 predictions about where this company's sustainability efforts will be in the next 3-5 years, considering industry trends, regulatory pressures, and their current position]
 
-            Additional Context:
-            {additional_search}
+    Search Results:
+    {search_results}
 
-            Format your response clearly with the two sections as requested.
-            """
-            
-            messages.append({"role": "user", "content": final_prompt})
-            
-            final_response = client.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            return final_response.choices[0].message.content
+    Additional Context:
+    {additional_search}
+
+    Format your response clearly with the two sections as requested.
+    """
+    
+    return {
+        "model": COMPANY_INSIGHTS_MODEL,
+        "messages": [
+            {"role": "system", "content": INSIGHTS_SYSTEM_PROMPT},
+            {"role": "user", "content": initial_prompt + final_prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 500
+    }
+
+async def get_company_sustainability_insights(company_name: str, industry: str = None) -> str:
+    """Get company information and generate sustainability barriers and journey predictions using OpenAI with MCP Tavily search"""
+    
+    try:
+        # A cached analysis also skips both searches
+        cache_key = _company_insights_cache_key(company_name, industry)
+        insights = await _cached_completion(cache_key)
+        if insights is not None:
+            return insights
         
-        else:
-            # Fallback if no function call was made
-            return f"Unable to search for current information about {company_name}. Please check the MCP Tavily integration."
+        request = await _company_insights_request(company_name, industry)
+        final_response = await async_client.chat.completions.create(
+            **request,
+            **_prompt_cache_options("company-insights")
+        )
+        
+        insights = final_response.choices[0].message.content
+        if insights:
+            await _store_completion(cache_key, insights)
+        return insights
             
-    except Exception as e:
-        print(f"Error generating company sustainability insights: {e}")
+    except Exception:
+        logger.exception("Error generating company sustainability insights")
         # Fallback response
         return f"""
         **Barriers to Sustainability (4 lines):**
@@ -515,4 +888,35 @@ def get_company_sustainability_insights(company_name: str, industry: str = None)
 
         **Sustainability Journey Predictions:**
         Based on industry trends, {company_name} will likely increase ESG reporting transparency and set science-based targets within the next 2-3 years. The company will face pressure to accelerate decarbonization efforts and invest in renewable energy solutions. Digital transformation and AI adoption will play a key role in optimizing resource efficiency and reducing environmental impact. Strategic partnerships with sustainability-focused vendors and technology providers will become essential for achieving long-term environmental goals.
-        """ 
\ No newline at end of file
+        """ 
+
+async def submit_bulk_reports(reports: List[tuple]) -> str:
+    """Submit the executive summary and insights calls for many (user_scores, industry_averages,
+    company_name, industry) reports as one Batch API job and return the batch id"""
+    # Keyed by completion cache key, so identical requests (e.g. one company's insights) are sent once
+    requests = {}
+    for user_scores, industry_averages, company_name, _ in reports:
+        request = _executive_summary_request(user_scores, industry_averages, company_name)
+        requests[_completion_cache_key(request)] = request
+    
+    # Insights keys do not depend on the search results, so replies still match when loaded hours later
+    companies = list(dict.fromkeys((company_name, industry) for _, _, company_name, industry in reports))
+    insight_requests = await asyncio.gather(*(
+        _company_insights_request(company_name, industry) for company_name, industry in companies
+    ))
+    for (company_name, industry), request in zip(companies, insight_requests):
+        requests[_company_insights_cache_key(company_name, industry)] = request
+    return await _submit_batch(requests, "bulk_reports.jsonl")
+
+async def poll_bulk_reports(batch_id: str) -> Optional[int]:
+    """Load a finished bulk job's replies into the completion cache and return how many were loaded
+    (None while the job is still running; BulkJobError if it failed, expired or was cancelled);
+    generating those reports then makes no OpenAI calls"""
+    
+    async def load_completion(cache_key: str, content: str) -> bool:
+        if not content:
+            return False
+        await _store_completion(cache_key, content)
+        return True
+    
+    return await _load_batch(batch_id, load_completion)
@@ -0,0 +1,91 @@
+import asyncio
+import functools
+from typing import Dict, Optional
+from config import PDF_RENDERER
+
+# Binary resources (e.g. the chart PNG) are referenced as RESOURCE_BASE_URL + name in the
+# report HTML and served from memory, so they never pass through the HTML as base64.
+# They are the only URLs either renderer loads: the report embeds LLM-generated markdown, so
+# anything else (file://, internal hosts) could read server-side data into the PDF
+RESOURCE_BASE_URL = "http://report.local/"
+
+# Page setup for WeasyPrint. Mirrors the margins, header and footer passed to Chromium's page.pdf() below.
+_WEASYPRINT_PAGE_CSS = """
+    @page {
+        size: A4;
+        margin: 2cm;
+        @top-center {
+            content: "Sustainability Maturity Assessment Report";
+            font-size: 10px;
+        }
+        @bottom-center {
+            content: "Page " counter(page) " of " counter(pages);
+            font-size: 10px;
+        }
+    }
+"""
+
+@functools.cache
+def _weasyprint_page_css():
+    """The WeasyPrint page stylesheet, parsed on first use"""
+    from weasyprint import CSS
+    return CSS(string=_WEASYPRINT_PAGE_CSS)
+
+def _write_pdf_weasyprint(pdf_html: str, pdf_path: str, resources: Dict[str, bytes]) -> None:
+    """Render static report HTML to a PDF file without a browser"""
+    # Imported here, so hosts without Pango/cairo can still run with PDF_RENDERER=chromium
+    from weasyprint import HTML
+    
+    def url_fetcher(url):
+        name = url[len(RESOURCE_BASE_URL):] if url.startswith(RESOURCE_BASE_URL) else None
+        if name in resources:
+            return {"string": resources[name], "mime_type": "image/png"}
+        # WeasyPrint logs the failure and renders the page without the resource
+        raise ValueError(f"Blocked PDF resource URL: {url}")
+
+    HTML(string=pdf_html, url_fetcher=url_fetcher).write_pdf(pdf_path, stylesheets=[_weasyprint_page_css()])
+
+async def _write_pdf_chromium(pdf_html: str, pdf_path: str, browser, resources: Dict[str, bytes]) -> None:
+    """Render report HTML to a PDF file with the shared Chromium browser (an isolated context per download)"""
+    context = await browser.new_context()
+    try:
+        page = await context.new_page()
+
+        async def fulfill_resource(route):
+            url = route.request.url
+            body = resources.get(url[len(RESOURCE_BASE_URL):]) if url.startswith(RESOURCE_BASE_URL) else None
+            if body is None:
+                await route.abort()
+            else:
+                await route.fulfill(body=body, content_type="image/png")
+
+        # Every request from the page goes through here; only our own resources are answered
+        await page.route("**/*", fulfill_resource)
+
+        # Set content and generate PDF
+        await page.set_content(pdf_html)
+        await page.pdf(
+            path=pdf_path,
+            format='A4',
+            margin={
+                'top': '2cm',
+                'right': '2cm',
+                'bottom': '2cm',
+                'left': '2cm'
+            },
+            print_background=True,
+            display_header_footer=True,
+            header_template='<div style="font-size:10px; text-align:center; width:100%;">Sustainability Maturity Assessment Report</div>',
+            footer_template='<div style="font-size:10px; text-align:center; width:100%;">Page <span class="pageNumber"></span> of <span class="totalPages"></span></div>'
+        )
+    finally:
+        await context.close()
+
+async def write_pdf(pdf_html: str, pdf_path: str, browser=None, resources: Optional[Dict[str, bytes]] = None) -> None:
+    """Render report HTML to pdf_path with the configured PDF_RENDERER"""
+    resources = resources or {}
+    if PDF_RENDERER == "chromium":
+        await _write_pdf_chromium(pdf_html, pdf_path, browser, resources)
+    else:
+        # WeasyPrint is CPU-bound, so it runs in a worker thread
+        await asyncio.to_thread(_write_pdf_weasyprint, pdf_html, pdf_path, resources)
@@ -1,110 +1,146 @@
-from typing import Dict, List, Tuple
+import asyncio
+import bisect
+import functools
+import logging
+import types
+from datetime import date
+from typing import Dict, List, Mapping, Tuple
+import numpy as np
 import plotly.graph_objects as go
-import plotly.io as pio
-import base64
 from models import SpiderChartModel
-from config import QUESTIONS_DATA, RECOMMENDATIONS_DATA, SURVEY_DATA, DIMENSION_MAPPING, USERS
-from services.openai_service import generate_executive_summary, get_company_sustainability_insights
+import config
+from config import DIMENSION_MAPPING, DIMENSION_CHART_KEYS, USERS
+from services.openai_service import generate_executive_summary, get_company_sustainability_insights, submit_bulk_reports
+from services.chart_service import MATURITY_LABELS, MATURITY_TICKS, SPIDER_CHART_FIELDS, render_radar_png
+
+logger = logging.getLogger(__name__)
 
 def calculate_dimension_averages(responses: Dict[str, int]) -> Dict[str, float]:
     """Calculate average scores for each dimension based on user responses"""
-    dimension_scores = {}
-    dimension_counts = {}
-    
-    # Group responses by dimension
-    for question in QUESTIONS_DATA["questionnaireReference"]:
-        question_id = question["questionId"]
-        dimension = question["dimension"]
-        
-        if question_id in responses:
-            score = responses[question_id]
-            
-            if dimension not in dimension_scores:
-                dimension_scores[dimension] = 0
-                dimension_counts[dimension] = 0
-            
-            dimension_scores[dimension] += score
-            dimension_counts[dimension] += 1
-    
-    # Calculate averages
+    question_positions, dimension_names, question_dimension_codes = config.DIMENSION_INDEX
+    
+    # Place answers in questionnaire order (unanswered questions are masked out)
+    # int64 holds any submitted integer (bincount upcasts the weights to float64 anyway)
+    scores = np.zeros(len(question_positions), dtype=np.int64)
+    answered = np.zeros(len(question_positions), dtype=bool)
+    for question_id, score in responses.items():
+        position = question_positions.get(question_id)
+        if position is not None:
+            scores[position] = score
+            answered[position] = True
+    
+    # Sum and count answers per dimension in one pass each
+    answered_codes = question_dimension_codes[answered]
+    dimension_totals = np.bincount(answered_codes, weights=scores[answered], minlength=len(dimension_names))
+    dimension_counts = np.bincount(answered_codes, minlength=len(dimension_names))
+    
+    # Calculate averages (dimensions without answers are left out)
     dimension_averages = {}
-    for dimension in dimension_scores:
-        if dimension_counts[dimension] > 0:
-            dimension_averages[dimension] = round(dimension_scores[dimension] / dimension_counts[dimension], 2)
+    for dimension, total, count in zip(dimension_names, dimension_totals.tolist(), dimension_counts.tolist()):
+        if count > 0:
+            dimension_averages[dimension] = round(total / count, 2)
     
     return dimension_averages
 
+# Maturity levels and the score at which each level after the first begins
+MATURITY_LEVELS = ("resist", "comply", "optimize", "reinvent", "lead")
+_MATURITY_THRESHOLDS = (2.0, 3.0, 4.0, 5.0)
+
 def determine_maturity_level(score: float) -> str:
     """Determine maturity level based on score"""
-    if score < 2.0:
-        return "resist"
-    elif score < 3.0:
-        return "comply"
-    elif score < 4.0:
-        return "optimize"
-    elif score < 5.0:
-        return "reinvent"
-    else:
-        return "lead"
+    return MATURITY_LEVELS[bisect.bisect_right(_MATURITY_THRESHOLDS, score)]
 
 def get_dimension_recommendation(dimension_name: str, maturity_level: str) -> str:
     """Get recommendation for a specific dimension and maturity level"""
-    for report in RECOMMENDATIONS_DATA["mini_reports"]:
-        if report["name"] == dimension_name:
-            return report["recommendations"].get(maturity_level, "No recommendation available")
-    return "No recommendation available"
+    return config.RECOMMENDATIONS_INDEX.get((dimension_name, maturity_level), "No recommendation available")
+
+def _survey_dimension_spellings(dimension_name: str) -> Tuple[str, ...]:
+    """A survey dimension name as-is and with the known survey-to-questionnaire renames applied"""
+    return (
+        dimension_name,
+        dimension_name.replace(" & ", " ").replace("Mgmt", "Management"),
+        dimension_name.replace("Costs", "Competency").replace("Design & Customers", "Product Management")
+    )
 
-def get_industry_averages() -> Dict[str, float]:
-    """Get industry averages mapped to our dimension names"""
+@functools.lru_cache(maxsize=1)
+def get_industry_averages() -> Mapping[str, float]:
+    """Get industry averages mapped to our dimension names (built once; the survey data is static)"""
     industry_avgs = {}
     
-    for avg_data in SURVEY_DATA["industry_averages"]:
-        dimension_name = avg_data["name"]
-        industry_avg = avg_data["industry_average"]
-        
-        # Map dimension names to our standard format
-        for our_dim, mapping in DIMENSION_MAPPING.items():
-            if (dimension_name == our_dim or 
-                dimension_name.replace(" & ", " ").replace("Mgmt", "Management") == our_dim or
-                dimension_name.replace("Costs", "Competency").replace("Design & Customers", "Product Management") == our_dim):
-                industry_avgs[our_dim] = industry_avg
-                break
-    
-    return industry_avgs
+    for avg_data in config.SURVEY_DATA.industry_averages:
+        # Map dimension names to our standard format with one dict lookup per spelling
+        our_dim = next((name for name in _survey_dimension_spellings(avg_data.name) if name in DIMENSION_MAPPING), None)
+        if our_dim is not None:
+            industry_avgs[our_dim] = avg_data.industry_average
+    
+    # Every caller shares this mapping, so it is read-only
+    return types.MappingProxyType(industry_avgs)
+
+# Chart axes in display order (DIMENSION_MAPPING is defined in questionnaire order)
+_CHART_DIMENSIONS = tuple(DIMENSION_MAPPING)
 
-def create_comparison_spider_chart(user_scores: Dict[str, float], company_name: str) -> str:
-    """Create a spider chart comparing user scores vs industry averages"""
+# Static layout of the comparison chart, validated once; each figure only sets its title
+_COMPARISON_CHART_TEMPLATE = go.layout.Template(layout=dict(
+    polar=dict(
+        radialaxis=dict(
+            visible=True,
+            range=[0, 5],
+            tickvals=MATURITY_TICKS,
+            ticktext=MATURITY_LABELS,
+            tickfont=dict(size=10),
+            gridcolor='rgba(0,0,0,0.1)'
+        ),
+        angularaxis=dict(
+            tickfont=dict(size=9),
+            rotation=90,
+            direction='clockwise'
+        ),
+        bgcolor='white'
+    ),
+    showlegend=True,
+    title=dict(
+        x=0.5,
+        font=dict(size=16, color='#4CAF50')
+    ),
+    legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=-0.1,
+        xanchor="center",
+        x=0.5
+    ),
+    width=700,
+    height=600,
+    margin=dict(l=80, r=80, t=80, b=100),
+    paper_bgcolor='white',
+    plot_bgcolor='white'
+))
+
+def _comparison_chart_data(user_scores: Dict[str, float]):
+    """Categories with the user's scores and the industry averages, in chart order"""
     
     # Get industry averages
     industry_avgs = get_industry_averages()
     
-    # Define the dimensions in order
-    dimensions = [
-        'Sustainability Leadership',
-        'Organization', 
-        'Sustainability Risk Management',
-        'Data & Systems',
-        'People & Competency',
-        'Asset Management',
-        'Product Management',
-        'Vendor Management',
-        'Metrics & Reporting',
-        'Managing Change'
-    ]
-    
     # Prepare data for chart
     user_values = []
     industry_values = []
     categories = []
     
-    for dim in dimensions:
+    for dim in _CHART_DIMENSIONS:
         if dim in user_scores:
             user_values.append(user_scores[dim])
             industry_values.append(industry_avgs.get(dim, 0))
             categories.append(dim)
     
-    # Create the spider chart
-    fig = go.Figure()
+    return categories, user_values, industry_values
+
+def build_comparison_spider_chart(user_scores: Dict[str, float], company_name: str) -> go.Figure:
+    """Build the Plotly figure comparing user scores vs industry averages"""
+    categories, user_values, industry_values = _comparison_chart_data(user_scores)
+    
+    # Create the spider chart on the shared layout template
+    fig = go.Figure(layout=dict(template=_COMPARISON_CHART_TEMPLATE))
     
     # Add user scores trace
     fig.add_trace(go.Scatterpolar(
@@ -129,190 +165,196 @@ def create_comparison_spider_chart(user_scores: Dict[str, float], company_name:
     ))
     
     fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 5],
-                tickvals=[1, 2, 3, 4, 5],
-                ticktext=['Resist', 'Comply', 'Optimize', 'Reinvent', 'Lead'],
-                tickfont=dict(size=10),
-                gridcolor='rgba(0,0,0,0.1)'
-            ),
-            angularaxis=dict(
-                tickfont=dict(size=9),
-                rotation=90,
-                direction='clockwise'
-            ),
-            bgcolor='white'
-        ),
-        showlegend=True,
-        title=dict(
-            text=f"Sustainability Maturity Assessment - {company_name} vs Industry",
-            x=0.5,
-            font=dict(size=16, color='#4CAF50')
-        ),
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=-0.1,
-            xanchor="center",
-            x=0.5
-        ),
-        width=700,
-        height=600,
-        margin=dict(l=80, r=80, t=80, b=100),
-        paper_bgcolor='white',
-        plot_bgcolor='white'
+        title_text=f"Sustainability Maturity Assessment - {company_name} vs Industry"
     )
     
-    # Convert to base64 image
-    img_bytes = pio.to_image(fig, format="png", width=700, height=600, scale=2)
-    img_base64 = base64.b64encode(img_bytes).decode()
-    
-    return img_base64
+    return fig
+
+def _comparison_chart_json(user_scores: Dict[str, float], company_name: str) -> Dict:
+    """Comparison figure as a plain dict for Plotly.js"""
+    return build_comparison_spider_chart(user_scores, company_name).to_plotly_json()
+
+@functools.lru_cache(maxsize=128)
+def _comparison_chart_png(company_name: str, score_items: Tuple[Tuple[str, float], ...]) -> bytes:
+    """PNG comparison chart; identical scores (industry averages are fixed) reuse the earlier render"""
+    categories, user_values, industry_values = _comparison_chart_data(dict(score_items))
+    
+    # Draw with matplotlib
+    return render_radar_png(
+        categories,
+        [
+            (f'{company_name} (Your Scores)', user_values, '#4CAF50', 0.3, 'solid'),
+            ('Industry Average', industry_values, '#FF6B6B', 0.1, 'dashed')
+        ],
+        f"Sustainability Maturity Assessment - {company_name} vs Industry",
+        width=700,
+        height=600
+    )
+
+def create_comparison_spider_chart(user_scores: Dict[str, float], company_name: str) -> bytes:
+    """Render the comparison spider chart as PNG bytes (used where a static image is required)"""
+    return _comparison_chart_png(company_name, tuple(sorted(user_scores.items())))
+
+# Lowest maturity for every chart field, for dimensions without answers
+_DEFAULT_CHART_DATA = dict.fromkeys(SPIDER_CHART_FIELDS, 1)
 
 def create_spider_chart_model(user_scores: Dict[str, float]) -> SpiderChartModel:
     """Create SpiderChartModel from user dimension scores"""
     # Initialize with default values
-    chart_data = {
-        'sustainability_leadership': 1,
-        'organization': 1,
-        'sustainability_risk_management': 1,
-        'data_systems': 1,
-        'people_competency': 1,
-        'direct_asset_management': 1,
-        'product_management': 1,
-        'vendor_management': 1,
-        'metrics_reporting': 1,
-        'managing_change': 1
-    }
+    chart_data = dict(_DEFAULT_CHART_DATA)
     
     # Update with actual user scores
     for dimension, score in user_scores.items():
-        if dimension in DIMENSION_MAPPING:
-            chart_key = DIMENSION_MAPPING[dimension]["chart_key"]
+        chart_key = DIMENSION_CHART_KEYS.get(dimension)
+        if chart_key:
             chart_data[chart_key] = int(round(score))
     
     return SpiderChartModel(**chart_data)
 
-def generate_sustainability_report(user_scores: Dict[str, float], company_name: str, industry: str = None) -> str:
+@functools.lru_cache(maxsize=1)
+def _format_assessment_date(day: date) -> str:
+    """Report header date; every report generated on the same day reuses the formatted string"""
+    return day.strftime('%B %d, %Y')
+
+async def generate_sustainability_report(user_scores: Dict[str, float], company_name: str, industry: str = None) -> str:
     """Generate a comprehensive sustainability report in markdown format"""
     
-    report_sections = []
-    
-    # Header
-    report_sections.append(f"# 🌱 Sustainability Maturity Assessment Report")
-    report_sections.append(f"**Company:** {company_name}")
-    report_sections.append(f"**Assessment Date:** {__import__('datetime').datetime.now().strftime('%B %d, %Y')}")
-    report_sections.append("")
-    
-    # AI-Generated Executive Summary
-    report_sections.append("## 📊 Executive Summary")
+    # The executive summary and company insights are independent OpenAI calls, so they run concurrently
     industry_avgs = get_industry_averages()
-    ai_summary = generate_executive_summary(user_scores, industry_avgs, company_name)
-    report_sections.append(ai_summary)
-    report_sections.append("")
+    ai_summary, sustainability_insights = await asyncio.gather(
+        generate_executive_summary(user_scores, industry_avgs, company_name),
+        get_company_sustainability_insights(company_name, industry),
+        return_exceptions=True
+    )
+    # The summary falls back to canned text on API errors, so anything raised here is a bug
+    if isinstance(ai_summary, Exception):
+        raise ai_summary
+    
+    # Score arithmetic for every section below is done once, on arrays aligned with user_scores
+    dimensions = list(user_scores)
+    score_values = list(user_scores.values())
+    industry_values = [industry_avgs.get(dimension, 0) for dimension in dimensions]
+    scores = np.array(score_values, dtype=np.float64)
+    gaps = np.round(scores - np.array(industry_values, dtype=np.float64), 2).tolist()
+    # Each dimension's maturity level and recommendation feed both the analysis and the priorities
+    maturity_levels = [
+        MATURITY_LEVELS[level] for level in np.searchsorted(_MATURITY_THRESHOLDS, scores, side="right").tolist()
+    ]
+    recommendations = [
+        get_dimension_recommendation(dimension, maturity_level)
+        for dimension, maturity_level in zip(dimensions, maturity_levels)
+    ]
     
     # Overall Score Information
-    overall_score = round(sum(user_scores.values()) / len(user_scores), 2)
+    overall_score = round(float(scores.mean()), 2)
     overall_maturity = determine_maturity_level(overall_score)
-    report_sections.append(f"**Overall Sustainability Maturity Score:** {overall_score}/5.0")
-    report_sections.append(f"**Overall Maturity Level:** {overall_maturity.title()}")
-    report_sections.append("")
     
     # AI-Powered Company Sustainability Insights
-    report_sections.append("## 🔍 Company-Specific Sustainability Insights")
-    try:
-        sustainability_insights = get_company_sustainability_insights(company_name, industry)
-        report_sections.append(sustainability_insights)
-    except Exception as e:
-        print(f"Error generating sustainability insights: {e}")
-        report_sections.append("*Sustainability insights are currently unavailable. Please ensure API keys are configured.*")
-    report_sections.append("")
-    
-    # Dimension Analysis
-    report_sections.append("## 📈 Dimension Analysis & Recommendations")
-    report_sections.append("")
-    
-    for dimension, score in user_scores.items():
-        maturity_level = determine_maturity_level(score)
-        recommendation = get_dimension_recommendation(dimension, maturity_level)
-        
-        report_sections.append(f"### {dimension}")
-        report_sections.append(f"- **Score** - {score}/5.0")
-        report_sections.append(f"- **Maturity Level** - {maturity_level.title()}")
-        report_sections.append(f"- **Next Steps** - {recommendation}")
-        report_sections.append("")
-    
-    # Industry Comparison
-    report_sections.append("## 🏭 Industry Comparison")
-    report_sections.append("| Dimension | Your Score | Industry Average | Gap |")
-    report_sections.append("|-----------|------------|------------------|-----|")
-    
-    for dimension, score in user_scores.items():
-        industry_avg = industry_avgs.get(dimension, 0)
-        gap = round(score - industry_avg, 2)
-        gap_indicator = "📈" if gap > 0 else "📉" if gap < 0 else "➡️"
-        report_sections.append(f"| {dimension} | {score} | {industry_avg} | {gap_indicator} {gap:+.2f} |")
+    if isinstance(sustainability_insights, Exception):
+        logger.error("Error generating sustainability insights", exc_info=sustainability_insights)
+        sustainability_insights = "*Sustainability insights are currently unavailable. Please ensure API keys are configured.*"
+    
+    # Each repeated section is joined into one block, then the report is filled in as a single template
+    dimension_analysis = "".join(
+        f"### {dimension}\n"
+        f"- **Score** - {score}/5.0\n"
+        f"- **Maturity Level** - {maturity_level.title()}\n"
+        f"- **Next Steps** - {recommendation}\n\n"
+        for dimension, score, maturity_level, recommendation in zip(dimensions, score_values, maturity_levels, recommendations)
+    )
     
-    report_sections.append("")
+    comparison_rows = "".join(
+        f"| {dimension} | {score} | {industry_avg} | {'📈' if gap > 0 else '📉' if gap < 0 else '➡️'} {gap:+.2f} |\n"
+        for dimension, score, industry_avg, gap in zip(dimensions, score_values, industry_values, gaps)
+    )
     
     # Key Insights
-    strong_areas = [dim for dim, score in user_scores.items() if score >= 3.5]
-    improvement_areas = [dim for dim, score in user_scores.items() if score < 2.5]
-    
-    report_sections.append("## 💡 Key Insights")
-    
-    if strong_areas:
-        report_sections.append("### 🚀 Strengths")
-        for area in strong_areas:
-            report_sections.append(f"- **{area}:** Performing well with score of {user_scores[area]}")
-        report_sections.append("")
-    
-    if improvement_areas:
-        report_sections.append("### ⚠️ Areas for Improvement")
-        for area in improvement_areas:
-            report_sections.append(f"- **{area}:** Needs attention with score of {user_scores[area]}")
-        report_sections.append("")
-    
-    # Recommendations Summary
-    report_sections.append("## 🎯 Priority Actions")
-    priority_dimensions = sorted(user_scores.items(), key=lambda x: x[1])[:3]
-    
-    for i, (dimension, score) in enumerate(priority_dimensions, 1):
-        maturity_level = determine_maturity_level(score)
-        recommendation = get_dimension_recommendation(dimension, maturity_level)
-        report_sections.append(f"**{i}. {dimension}**")
-        report_sections.append(f"   {recommendation}")
-        report_sections.append("")
-    
-    return "\n".join(report_sections)
+    strong_positions = np.flatnonzero(scores >= 3.5).tolist()
+    improvement_positions = np.flatnonzero(scores < 2.5).tolist()
+    key_insights = ""
+    if strong_positions:
+        key_insights += "### 🚀 Strengths\n" + "".join(
+            f"- **{dimensions[i]}:** Performing well with score of {score_values[i]}\n" for i in strong_positions
+        ) + "\n"
+    if improvement_positions:
+        key_insights += "### ⚠️ Areas for Improvement\n" + "".join(
+            f"- **{dimensions[i]}:** Needs attention with score of {score_values[i]}\n" for i in improvement_positions
+        ) + "\n"
+    
+    # Recommendations Summary (a stable argsort keeps ties in questionnaire order, as sorted() did)
+    priority_positions = np.argsort(scores, kind="stable")[:3].tolist()
+    priority_actions = "\n".join(
+        f"**{rank}. {dimensions[position]}**\n   {recommendations[position]}\n"
+        for rank, position in enumerate(priority_positions, 1)
+    )
+    
+    return f"""# 🌱 Sustainability Maturity Assessment Report
+**Company:** {company_name}
+**Assessment Date:** {_format_assessment_date(date.today())}
+
+## 📊 Executive Summary
+{ai_summary}
+
+**Overall Sustainability Maturity Score:** {overall_score}/5.0
+**Overall Maturity Level:** {overall_maturity.title()}
+
+## 🔍 Company-Specific Sustainability Insights
+{sustainability_insights}
 
-def process_questionnaire_responses(current_user: str, responses: Dict[str, int], company_name: str) -> Dict:
+## 📈 Dimension Analysis & Recommendations
+
+{dimension_analysis}## 🏭 Industry Comparison
+| Dimension | Your Score | Industry Average | Gap |
+|-----------|------------|------------------|-----|
+{comparison_rows}
+## 💡 Key Insights
+{key_insights}## 🎯 Priority Actions
+{priority_actions}"""
+
+async def process_questionnaire_responses(current_user: str, responses: Dict[str, int], company_name: str) -> Dict:
     """Main function to process questionnaire responses and generate complete analysis"""
     
     # Step 1: Calculate dimension averages
     dimension_averages = calculate_dimension_averages(responses)
     
-    # Step 2: Create spider chart comparing user vs industry
-    spider_chart_base64 = create_comparison_spider_chart(dimension_averages, company_name)
+    # Step 2: Create spider chart comparing user vs industry (rendered by Plotly.js in the browser)
+    # Figure building is CPU-bound, so it runs in a worker thread while the report is generated
+    spider_chart_task = asyncio.create_task(asyncio.to_thread(_comparison_chart_json, dimension_averages, company_name))
     
     # Step 3: Create spider chart model for compatibility with existing system
     spider_chart_model = create_spider_chart_model(dimension_averages)
     
     # Step 4: Generate comprehensive report
     user_industry = USERS.get(current_user, {}).get('industry', None)
-    sustainability_report = generate_sustainability_report(dimension_averages, company_name, user_industry)
+    sustainability_report = await generate_sustainability_report(dimension_averages, company_name, user_industry)
+    spider_chart_figure = await spider_chart_task
     
     # Step 5: Prepare result structure similar to langflow result
+    overall_score = round(sum(dimension_averages.values()) / len(dimension_averages), 2)
     result = {
         "success": True,
         "extracted_text": sustainability_report,
         "dimension_scores": dimension_averages,
-        "spider_chart_base64": spider_chart_base64,
+        "spider_chart_figure": spider_chart_figure,
         "spider_chart_model": spider_chart_model,
-        "overall_score": round(sum(dimension_averages.values()) / len(dimension_averages), 2),
-        "maturity_level": determine_maturity_level(round(sum(dimension_averages.values()) / len(dimension_averages), 2))
+        "overall_score": overall_score,
+        "maturity_level": determine_maturity_level(overall_score)
     }
     
-    return result 
\ No newline at end of file
+    return result
+
+async def submit_bulk_questionnaires(submissions: List[Tuple[str, Dict[str, int], str]]) -> str:
+    """Submit the OpenAI calls for many (current_user, responses, company_name) questionnaires as
+    one Batch API job (for scheduled bulk runs) and return the batch id. Once poll_bulk_reports
+    has loaded the results, process_questionnaire_responses answers those calls from cache."""
+    industry_avgs = get_industry_averages()
+    reports = [
+        (
+            calculate_dimension_averages(responses),
+            industry_avgs,
+            company_name,
+            USERS.get(current_user, {}).get('industry', None)
+        )
+        for current_user, responses, company_name in submissions
+    ]
+    return await submit_bulk_reports(reports)
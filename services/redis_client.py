@@ -0,0 +1,5 @@
+from redis.asyncio import Redis
+from config import REDIS_URL
+
+# Shared Redis client (None when REDIS_URL is unset, callers fall back to in-process storage)
+redis_client = Redis.from_url(REDIS_URL) if REDIS_URL else None
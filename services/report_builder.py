@@ -0,0 +1,138 @@
+import asyncio
+import base64
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+from config import USERS
+from models import SpiderChartModel
+from services import markdown_cache, session_store
+from services.markdown_cache import strip_markdown_fence
+from services.openai_service import extract_sustainability_scores
+from services.chart_service import create_spider_chart
+from services.questionnaire_processor import create_comparison_spider_chart
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ReportCtx:
+    """Everything /report and /download-pdf need to display a session's report"""
+    langflow_result: Optional[Dict] = None
+    markdown_content: Optional[str] = None
+    html_content: Optional[str] = None
+    spider_chart_version: Optional[str] = None
+    spider_chart_png: Optional[bytes] = None
+    spider_chart_figure: Optional[Dict] = None
+    sustainability_scores: Optional[SpiderChartModel] = None
+    general_information: Optional[Dict] = None
+
+def _as_scores(value) -> Optional[SpiderChartModel]:
+    """Rebuild a SpiderChartModel decoded from the store as a plain dict"""
+    return SpiderChartModel(**value) if isinstance(value, dict) else value
+
+def _report_company_name(langflow_result: Dict, current_user: str) -> str:
+    """Company name from the submitted general info, falling back to the user config"""
+    general_information = langflow_result.get("general_information") or {}
+    return general_information.get("company") or USERS[current_user]['company']
+
+def _chart_version(png: bytes) -> str:
+    """Short digest of a chart PNG, used to version its URL"""
+    return hashlib.blake2b(png, digest_size=8).hexdigest()
+
+async def _store_chart(session_id: str, png: bytes, rendered: Dict) -> None:
+    """Keep the chart PNG as raw bytes next to the result and record its version"""
+    await session_store.set_bytes(session_id, png, part="chart")
+    rendered["spider_chart_version"] = _chart_version(png)
+
+async def load_result(session_id: Optional[str]) -> Optional[Dict]:
+    """Processed questionnaire result for the session, if any"""
+    if not session_id:
+        return None
+    langflow_result = await session_store.get(session_id)
+    if langflow_result and "spider_chart_model" in langflow_result:
+        langflow_result["spider_chart_model"] = _as_scores(langflow_result["spider_chart_model"])
+    return langflow_result
+
+async def _render_report_artifacts(session_id: str, langflow_result: Dict, current_user: str) -> Dict:
+    """Render report HTML and scores once per result, stored next to the result"""
+    rendered = await session_store.get(session_id, part="rendered")
+    if rendered is not None:
+        rendered["sustainability_scores"] = _as_scores(rendered["sustainability_scores"])
+        return rendered
+
+    processed_content = strip_markdown_fence(langflow_result["extracted_text"])
+    # Markdown rendering does not depend on the scores, so it runs alongside any OpenAI extraction
+    html_task = markdown_cache.render(langflow_result["extracted_text"])
+
+    # Use spider chart from processed result if available (Langflow results carry it as base64)
+    spider_chart_png = None
+    if langflow_result.get("spider_chart_base64"):
+        spider_chart_png = base64.b64decode(langflow_result["spider_chart_base64"])
+    
+    # Use spider chart model from processed result if available
+    if "spider_chart_model" in langflow_result:
+        html_content = await html_task
+        sustainability_scores = langflow_result["spider_chart_model"]
+    else:
+        # Fallback to OpenAI extraction if needed
+        html_content, sustainability_scores = await asyncio.gather(
+            html_task, extract_sustainability_scores(processed_content)
+        )
+        if not spider_chart_png and "spider_chart_figure" not in langflow_result:
+            spider_chart_png = await asyncio.to_thread(
+                create_spider_chart, sustainability_scores, _report_company_name(langflow_result, current_user)
+            )
+    
+    rendered = {
+        "html_content": html_content,
+        "spider_chart_version": None,
+        "sustainability_scores": sustainability_scores
+    }
+    if spider_chart_png:
+        await _store_chart(session_id, spider_chart_png, rendered)
+    await session_store.set(session_id, rendered, part="rendered")
+    return rendered
+
+async def build_report(session_id: Optional[str], current_user: str, static_chart: bool = False) -> ReportCtx:
+    """Build the report for a session (static_chart=True also ensures a PNG chart for the PDF)"""
+    ctx = ReportCtx(langflow_result=await load_result(session_id))
+    langflow_result = ctx.langflow_result
+
+    if langflow_result:
+        # Extract general information if available in langflow result
+        ctx.general_information = langflow_result.get("general_information")
+
+        # Extract markdown content if available
+        if langflow_result.get("success") and "extracted_text" in langflow_result:
+            ctx.markdown_content = langflow_result["extracted_text"]
+
+            # Convert markdown to HTML on the server side (shared between /report and /download-pdf)
+            try:
+                rendered = await _render_report_artifacts(session_id, langflow_result, current_user)
+                ctx.html_content = rendered["html_content"]
+                ctx.sustainability_scores = rendered["sustainability_scores"]
+                ctx.spider_chart_version = rendered["spider_chart_version"]
+                ctx.spider_chart_figure = langflow_result.get("spider_chart_figure")
+                
+                if static_chart:
+                    if ctx.spider_chart_version:
+                        ctx.spider_chart_png = await session_store.get_bytes(session_id, part="chart")
+                    if not ctx.spider_chart_png and "dimension_scores" in langflow_result:
+                        # The report page draws the chart in the browser, so the PDF image is rendered on first download
+                        ctx.spider_chart_png = await asyncio.to_thread(
+                            create_comparison_spider_chart,
+                            langflow_result["dimension_scores"], _report_company_name(langflow_result, current_user)
+                        )
+                        await _store_chart(session_id, ctx.spider_chart_png, rendered)
+                        ctx.spider_chart_version = rendered["spider_chart_version"]
+                        await session_store.set(session_id, rendered, part="rendered")
+                
+            except Exception:
+                logger.exception("Error converting markdown to HTML")
+                ctx.html_content = f"<pre>{ctx.markdown_content}</pre>"
+
+    # Fallback to user's general info if not in langflow result
+    if not ctx.general_information and current_user in USERS and "general_info" in USERS[current_user]:
+        ctx.general_information = USERS[current_user]["general_info"]
+
+    return ctx
@@ -0,0 +1,60 @@
+from typing import Dict, Optional
+from cachetools import TTLCache
+from pydantic import BaseModel
+import orjson
+from config import SESSION_TTL
+from services.redis_client import redis_client
+
+# Fallback store used when REDIS_URL is unset (single worker only),
+# bounded and expiring alongside the session
+_local_store = TTLCache(maxsize=1000, ttl=SESSION_TTL)
+
+def _key(session_id: str, part: Optional[str]) -> str:
+    """Redis key for a session's result (or one of its derived parts, e.g. "rendered")"""
+    return f"lf:{session_id}" if part is None else f"lf:{session_id}:{part}"
+
+def _encode_model(obj):
+    """orjson fallback for pydantic models stored in results"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+async def get(session_id: str, part: Optional[str] = None) -> Optional[Dict]:
+    """Read a stored dict for the session, or None if missing or expired"""
+    key = _key(session_id, part)
+    if redis_client is not None:
+        payload = await redis_client.get(key)
+        return orjson.loads(payload) if payload else None
+    return _local_store.get(key)
+
+async def set(session_id: str, value: Dict, ex: int = SESSION_TTL, part: Optional[str] = None):
+    """Store a dict for the session, expiring after `ex` seconds (SESSION_TTL in the fallback store)"""
+    key = _key(session_id, part)
+    if redis_client is not None:
+        payload = orjson.dumps(value, default=_encode_model, option=orjson.OPT_SERIALIZE_NUMPY)
+        await redis_client.set(key, payload, ex=ex)
+    else:
+        _local_store[key] = value
+
+async def delete(session_id: str, part: Optional[str] = None):
+    """Drop a stored dict for the session"""
+    key = _key(session_id, part)
+    if redis_client is not None:
+        await redis_client.delete(key)
+    else:
+        _local_store.pop(key, None)
+
+async def get_bytes(session_id: str, part: str) -> Optional[bytes]:
+    """Read a stored binary part for the session (e.g. the chart PNG), or None if missing or expired"""
+    key = _key(session_id, part)
+    if redis_client is not None:
+        return await redis_client.get(key)
+    return _local_store.get(key)
+
+async def set_bytes(session_id: str, value: bytes, part: str, ex: int = SESSION_TTL):
+    """Store a binary part for the session as-is (no JSON or base64 encoding)"""
+    key = _key(session_id, part)
+    if redis_client is not None:
+        await redis_client.set(key, value, ex=ex)
+    else:
+        _local_store[key] = value
@@ -0,0 +1,12 @@
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+from config import DEBUG_MODE
+
+# One Jinja environment shared by every router, so each template is compiled once per process.
+# Compiled bytecode is also cached on disk (in the system temp dir) to speed up worker start,
+# and template files are only re-checked for changes in debug mode
+templates = Jinja2Templates(
+    directory="templates",
+    bytecode_cache=FileSystemBytecodeCache(),
+    auto_reload=DEBUG_MODE
+)
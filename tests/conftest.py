@@ -0,0 +1,63 @@
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Tests run without Redis or real credentials: caches stay in process and the OpenAI client is faked
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.pop("REDIS_URL", None)
+
+from services import openai_service
+
+
+class FakeFiles:
+    """Records uploaded batch input files and serves batch output files by id"""
+
+    def __init__(self):
+        self.uploads = []
+        self.contents = {}
+
+    async def create(self, file, purpose):
+        self.uploads.append((file, purpose))
+        return SimpleNamespace(id=f"file-{len(self.uploads)}")
+
+    async def content(self, file_id):
+        return SimpleNamespace(text=self.contents[file_id])
+
+
+class FakeBatches:
+    """Creates batch jobs and returns whatever job state the test sets"""
+
+    def __init__(self):
+        self.created = []
+        self.jobs = {}
+
+    async def create(self, **kwargs):
+        self.created.append(kwargs)
+        return SimpleNamespace(id=f"batch-{len(self.created)}")
+
+    async def retrieve(self, batch_id):
+        return self.jobs[batch_id]
+
+
+def batch_job(status, output_file_id=None, error_file_id=None, errors=()):
+    """A Batch API job as returned by batches.retrieve"""
+    return SimpleNamespace(
+        status=status,
+        output_file_id=output_file_id,
+        error_file_id=error_file_id,
+        errors=SimpleNamespace(data=[SimpleNamespace(code=code, message=message) for code, message in errors]) if errors else None
+    )
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """Replace the module's OpenAI client with in-memory files and batches, with empty caches"""
+    client = SimpleNamespace(files=FakeFiles(), batches=FakeBatches())
+    monkeypatch.setattr(openai_service, "async_client", client)
+    openai_service._score_cache.clear()
+    openai_service._completion_cache.clear()
+    return client
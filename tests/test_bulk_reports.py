@@ -0,0 +1,52 @@
+import asyncio
+
+import orjson
+import pytest
+
+from conftest import batch_job
+from services import openai_service
+
+
+def reply_line(custom_id, content):
+    """One line of a Batch API output file"""
+    return orjson.dumps({
+        "custom_id": custom_id,
+        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}}
+    }).decode()
+
+
+def test_poll_bulk_reports_waits_while_running(fake_openai):
+    for status in ("validating", "in_progress", "finalizing", "cancelling"):
+        fake_openai.batches.jobs["batch-1"] = batch_job(status)
+        assert asyncio.run(openai_service.poll_bulk_reports("batch-1")) is None
+
+
+def test_poll_bulk_reports_loads_completed_replies(fake_openai):
+    fake_openai.files.contents["out-1"] = "\n".join([reply_line("key-a", "Summary A"), reply_line("key-b", "")])
+    fake_openai.batches.jobs["batch-1"] = batch_job("completed", output_file_id="out-1")
+
+    assert asyncio.run(openai_service.poll_bulk_reports("batch-1")) == 1
+    assert asyncio.run(openai_service._cached_completion("key-a")) == "Summary A"
+    assert asyncio.run(openai_service._cached_completion("key-b")) is None
+
+
+def test_poll_bulk_reports_keeps_partial_output_of_expired_job(fake_openai):
+    fake_openai.files.contents["out-1"] = reply_line("key-a", "Summary A")
+    fake_openai.batches.jobs["batch-1"] = batch_job("expired", output_file_id="out-1", error_file_id="err-1")
+
+    with pytest.raises(openai_service.BulkJobError) as excinfo:
+        asyncio.run(openai_service.poll_bulk_reports("batch-1"))
+
+    assert excinfo.value.status == "expired"
+    assert excinfo.value.loaded == 1
+    assert "err-1" in str(excinfo.value)
+    assert asyncio.run(openai_service._cached_completion("key-a")) == "Summary A"
+
+
+def test_poll_bulk_reports_raises_for_failed_job(fake_openai):
+    fake_openai.batches.jobs["batch-1"] = batch_job("failed", errors=[("invalid_request", "Bad JSONL line 1")])
+
+    with pytest.raises(openai_service.BulkJobError, match="Bad JSONL line 1") as excinfo:
+        asyncio.run(openai_service.poll_bulk_reports("batch-1"))
+
+    assert excinfo.value.loaded == 0
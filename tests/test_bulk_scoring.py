@@ -0,0 +1,116 @@
+import asyncio
+
+import orjson
+import pytest
+
+from conftest import batch_job
+from models import SpiderChartModel
+from services import openai_service
+
+REPORTS = [
+    "# Sustainability Leadership\nStrong board oversight of climate targets.\n",
+    "# Data Systems\nEmissions data is collected manually in spreadsheets.\n"
+]
+
+
+def submitted_lines(fake_openai):
+    """Decoded JSONL lines of the single uploaded batch input file"""
+    (filename, payload), purpose = fake_openai.files.uploads[0]
+    assert purpose == "batch"
+    return filename, [orjson.loads(line) for line in payload.splitlines()]
+
+
+def test_submit_bulk_scoring_writes_one_request_per_distinct_report(fake_openai):
+    batch_id = asyncio.run(openai_service.submit_bulk_scoring(REPORTS + REPORTS[:1]))
+
+    filename, lines = submitted_lines(fake_openai)
+    assert batch_id == "batch-1"
+    assert filename == "bulk_scoring.jsonl"
+    assert [line["custom_id"] for line in lines] == [
+        openai_service._score_cache_key(openai_service._extract_score_section(report)) for report in REPORTS
+    ]
+    for line in lines:
+        assert line["method"] == "POST"
+        assert line["url"] == "/v1/chat/completions"
+        assert line["body"]["model"] == openai_service.SCORE_EXTRACTION_MODEL
+        assert line["body"]["temperature"] == 0
+        assert line["body"]["response_format"]["json_schema"]["strict"] is True
+    assert fake_openai.batches.created == [
+        {"input_file_id": "file-1", "endpoint": "/v1/chat/completions", "completion_window": "24h"}
+    ]
+
+
+def test_polled_scores_are_served_by_extraction(fake_openai):
+    asyncio.run(openai_service.submit_bulk_scoring(REPORTS))
+    _, lines = submitted_lines(fake_openai)
+
+    # Answer every submitted request under its custom_id, as the Batch API does
+    scores = SpiderChartModel(**dict.fromkeys(SpiderChartModel.model_fields, 5))
+    fake_openai.files.contents["out-1"] = "\n".join(
+        orjson.dumps({
+            "custom_id": line["custom_id"],
+            "response": {"body": {"choices": [{"message": {"content": scores.model_dump_json()}}]}}
+        }).decode()
+        for line in lines
+    )
+    fake_openai.batches.jobs["batch-1"] = batch_job("completed", output_file_id="out-1")
+
+    assert asyncio.run(openai_service.poll_bulk_scoring("batch-1")) == len(REPORTS)
+    # The fake client has no chat API, so these can only come from the cache
+    for report in REPORTS:
+        assert asyncio.run(openai_service.extract_sustainability_scores(report)) == scores
+
+
+def test_poll_bulk_scoring_waits_while_running(fake_openai):
+    fake_openai.batches.jobs["batch-1"] = batch_job("in_progress")
+    assert asyncio.run(openai_service.poll_bulk_scoring("batch-1")) is None
+
+
+@pytest.mark.parametrize("status", ["failed", "expired", "cancelled"])
+def test_poll_bulk_scoring_raises_when_job_ends_incomplete(fake_openai, status):
+    fake_openai.batches.jobs["batch-1"] = batch_job(status, errors=[("batch_expired", "Batch expired")])
+
+    with pytest.raises(openai_service.BulkJobError) as excinfo:
+        asyncio.run(openai_service.poll_bulk_scoring("batch-1"))
+
+    assert excinfo.value.status == status
+    assert excinfo.value.errors == ["batch_expired: Batch expired"]
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Drive _RateLimiter with a fake monotonic clock; sleeping advances it. Returns the sleeps taken"""
+    now = [0.0]
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+        await real_sleep(0)
+
+    monkeypatch.setattr(openai_service.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(openai_service.asyncio, "sleep", sleep)
+    return sleeps
+
+
+def test_rate_limiter_paces_requests_per_minute(fake_clock):
+    async def acquire_three():
+        limiter = openai_service._RateLimiter(requests_per_minute=2, tokens_per_minute=1000)
+        for _ in range(3):
+            await limiter.acquire(10)
+
+    asyncio.run(acquire_three())
+    # Two requests fit the bucket; the third waits for one request to refill (30s at 2/min)
+    assert sum(fake_clock) == pytest.approx(30)
+
+
+def test_rate_limiter_paces_tokens_per_minute(fake_clock):
+    async def acquire_two():
+        limiter = openai_service._RateLimiter(requests_per_minute=100, tokens_per_minute=1000)
+        await limiter.acquire(800)
+        await limiter.acquire(800)
+
+    asyncio.run(acquire_two())
+    # 200 tokens are left, so the second call waits for 600 more (36s at 1000/min)
+    assert sum(fake_clock) == pytest.approx(36)
@@ -0,0 +1,34 @@
+import pytest
+
+from config import DIMENSION_MAPPING
+from services import openai_service
+
+
+def report_stating(score: str) -> str:
+    """A report that states every dimension's score in the given format"""
+    return "\n".join(f"- **{dimension}**: {score}" for dimension in DIMENSION_MAPPING)
+
+
+@pytest.mark.parametrize("score, expected", [
+    ("4/5", 4),
+    ("4 out of 5", 4),
+    ("3.0/5.0", 3),
+    ("3.5 / 5", 4),
+    ("2.5 out of 5.0", 2),
+    ("4.2/5.", 4),
+    ("5.4/5", 5),
+])
+def test_stated_scores_are_rounded_like_questionnaire_scores(score, expected):
+    scores = openai_service._regex_scores(report_stating(score))
+    assert scores is not None
+    assert set(scores.model_dump().values()) == {expected}
+
+
+@pytest.mark.parametrize("score", ["4/50", "3/5.5", "2 out of 10", "3/55"])
+def test_other_denominators_are_not_read_as_scores(score):
+    assert openai_service._regex_scores(report_stating(score)) is None
+
+
+def test_missing_dimension_falls_back_to_extraction():
+    report = report_stating("4/5").replace(next(iter(DIMENSION_MAPPING)), "Something else", 1)
+    assert openai_service._regex_scores(report) is None